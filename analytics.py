@@ -0,0 +1,206 @@
+import os
+import re
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from archive_input import is_archive_member, read_member
+from text_cache import get_text_cache
+
+# Clause-level fields pulled out of the text so dashboards can aggregate them
+field_patterns = {
+    "Amount": r"(\d[\d,]*(?:\.\d+)?)\s*(?:USD|EUR|GBP|SEK|CAD)\b",
+    "Currency": r"\d\s*(USD|EUR|GBP|SEK|CAD)\b",
+    "Days": r"within (\d+) days",
+    "Years": r"(\d+) years",
+    "Jurisdiction": r"(?:laws of|governed by) ([A-Z][A-Za-z]+(?: [A-Z][A-Za-z]+)*)",
+}
+
+# Which clauses each field is read from; Jurisdiction belongs to the whole contract
+clause_fields = {
+    "Amount": ["liability cap"],
+    "Currency": ["liability cap"],
+    "Days": ["payment terms"],
+    "Years": ["archiving", "data retention"],
+}
+
+# Keyword lines are mostly section headings, so fields are read from the text that follows them
+context_chars = 600
+next_heading = re.compile(r"\n\d+\.\s")
+
+# Fixed Parquet types, so a column that is empty in the first chunk doesn't become Arrow null
+column_types = {
+    "Page": pa.int64(),
+    "Offset": pa.int64(),
+    "Group ID": pa.int64(),
+    "Document Group": pa.int64(),
+    "Amount": pa.float64(),
+    "Days": pa.float64(),
+    "Years": pa.float64(),
+}
+
+canned_queries = {
+    "liability-by-jurisdiction": """
+        SELECT Jurisdiction, Currency, count(*) AS Contracts, avg("Liability Cap") AS "Average Liability Cap"
+        FROM contracts
+        WHERE "Contract Type" = 'MSA' AND "Liability Cap" IS NOT NULL
+        GROUP BY Jurisdiction, Currency
+        ORDER BY Jurisdiction, Currency
+    """,
+    "supplier-confidentiality-share": """
+        SELECT Company,
+               sum(Clauses) FILTER (WHERE Tone = 'supplier-friendly') / sum(Clauses) AS "Supplier-Friendly Share"
+        FROM company_rollup
+        WHERE Clause = 'confidentiality'
+        GROUP BY Company
+        ORDER BY "Supplier-Friendly Share" DESC
+    """,
+}
+
+def load_pages(file_path):
+    """Return the cached page texts of a contract, or no pages if it can't be read any more."""
+    try:
+        data = read_member(file_path) if is_archive_member(file_path) else None
+        return get_text_cache().get_pages(file_path, data=data)
+    except (OSError, KeyError, RuntimeError, ValueError):
+        return []
+
+def clause_contexts(chunk, page_lookup=None):
+    """Return (text following each clause line, full text of its contract) for a chunk of results."""
+    page_lookup = page_lookup or load_pages
+    if not {"File", "Page", "Offset"} <= set(chunk.columns):
+        # Older results have no positions; the clause line is all there is
+        content = chunk["Content"].astype(str)
+        return content, content
+    documents = {}
+    contexts = []
+    for file_path, page, offset in zip(chunk["File"], chunk["Page"], chunk["Offset"]):
+        if file_path not in documents:
+            documents[file_path] = page_lookup(file_path)
+        pages = documents[file_path]
+        page_text = pages[int(page) - 1] if 0 < int(page) <= len(pages) else ""
+        # Stop at the next numbered heading so a section never borrows its neighbour's values
+        section = next_heading.split(page_text[int(offset):int(offset) + context_chars], maxsplit=1)[0]
+        contexts.append(" ".join(section.split()))
+    texts = {file_path: " ".join(" ".join(pages).split()) for file_path, pages in documents.items()}
+    return pd.Series(contexts, index=chunk.index), chunk["File"].map(texts)
+
+def add_clause_fields(chunk, page_lookup=None):
+    """Extract amounts, currencies and periods from the text after each clause heading, and the jurisdiction from its contract."""
+    contexts, documents = clause_contexts(chunk, page_lookup)
+    for field, pattern in field_patterns.items():
+        if field == "Jurisdiction":
+            # Search each contract's text once rather than once per clause row
+            unique = documents.drop_duplicates()
+            found = dict(zip(unique, unique.str.extract(pattern, expand=False)))
+            values = documents.map(found)
+        else:
+            values = contexts.str.extract(pattern, expand=False)
+        if field in clause_fields:
+            # An amount under "payment terms" is not a liability cap
+            values = values.where(chunk["Clause"].isin(clause_fields[field]))
+        if field in ("Amount", "Days", "Years"):
+            values = pd.to_numeric(values.str.replace(",", ""), errors="coerce").astype("float64")
+        chunk[field] = values
+    return chunk
+
+def results_schema(columns):
+    """Arrow schema for the clauses table: fixed numeric types, strings for everything else."""
+    return pa.schema([(column, column_types.get(column, pa.string())) for column in columns])
+
+def conform_chunk(chunk, schema):
+    """Coerce a chunk's columns to the schema's types, keeping missing values as nulls."""
+    chunk = chunk.reindex(columns=schema.names)
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            chunk[field.name] = pd.to_numeric(chunk[field.name], errors="coerce").astype("Int64")
+        elif pa.types.is_floating(field.type):
+            chunk[field.name] = pd.to_numeric(chunk[field.name], errors="coerce").astype("float64")
+        else:
+            chunk[field.name] = chunk[field.name].astype("string")
+    return chunk
+
+def export_results(input_csv, parquet_dir="outputs/analytics", chunk_size=250000, page_lookup=None):
+    """Convert a results CSV to Parquet without its vector column and precompute rollups."""
+    os.makedirs(parquet_dir, exist_ok=True)
+    clauses_path = os.path.join(parquet_dir, "clauses.parquet")
+    print(f"Exporting {input_csv} to {clauses_path}...")
+
+    writer, schema, rows = None, None, 0
+    # Never read the embedding strings; they dominate the CSV size
+    for chunk in pd.read_csv(input_csv, usecols=lambda column: column != "Embeddings", chunksize=chunk_size):
+        if "Tone" not in chunk.columns:
+            # Imported here because validate_embeddings pulls in torch, which queries never need
+            from validate_embeddings import label_tone
+            chunk["Tone"] = chunk["Content"].astype(str).map(label_tone)
+        chunk = add_clause_fields(chunk, page_lookup)
+        if writer is None:
+            schema = results_schema(chunk.columns)
+            writer = pq.ParquetWriter(clauses_path, schema, compression="zstd")
+        table = pa.Table.from_pandas(conform_chunk(chunk, schema), schema=schema, preserve_index=False)
+        writer.write_table(table, row_group_size=chunk_size)
+        rows += len(chunk)
+    if writer is None:
+        raise ValueError(f"No rows found in {input_csv}.")
+    writer.close()
+
+    conn = duckdb.connect()
+    conn.read_parquet(clauses_path).create_view("clauses")
+    # Older results have no File column; fall back to one contract per company and type
+    if "File" in schema.names:
+        contract_key, contract_columns = "File", "File, any_value(Company) AS Company, any_value(\"Contract Type\") AS \"Contract Type\""
+    else:
+        contract_key = contract_columns = "Company, \"Contract Type\""
+    # One row per contract with the values dashboards filter and average on
+    conn.sql(f"""
+        SELECT {contract_columns},
+               max(Jurisdiction) AS Jurisdiction,
+               max(Amount) FILTER (WHERE Clause = 'liability cap') AS "Liability Cap",
+               max(Currency) FILTER (WHERE Clause = 'liability cap') AS Currency,
+               max(Days) AS "Payment Days",
+               max(Years) AS "Retention Years",
+               count(*) AS Clauses
+        FROM clauses
+        GROUP BY {contract_key}
+    """).write_parquet(os.path.join(parquet_dir, "contracts.parquet"))
+    for name, keys in (("company_rollup", "Company, \"Contract Type\""), ("type_rollup", "\"Contract Type\"")):
+        conn.sql(f"""
+            SELECT {keys}, Clause, Tone, count(*) AS Clauses, avg(Amount) AS "Average Amount"
+            FROM clauses
+            GROUP BY {keys}, Clause, Tone
+        """).write_parquet(os.path.join(parquet_dir, name + ".parquet"))
+    conn.close()
+    print(f"Exported {rows} clauses and rollups to {parquet_dir}")
+
+def connect(parquet_dir="outputs/analytics"):
+    """Open an in-process DuckDB connection with views over the exported tables."""
+    conn = duckdb.connect()
+    for name in ("clauses", "contracts", "company_rollup", "type_rollup"):
+        path = os.path.join(parquet_dir, f"{name}.parquet")
+        if os.path.isfile(path):
+            conn.read_parquet(path).create_view(name)
+    return conn
+
+def query(sql, parquet_dir="outputs/analytics"):
+    """Run SQL against the exported results and return a DataFrame."""
+    conn = connect(parquet_dir)
+    try:
+        return conn.execute(sql).df()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query clause analysis results with DuckDB over Parquet.")
+    parser.add_argument("--parquet-dir", default="outputs/analytics", help="Directory holding the exported tables.")
+    parser.add_argument("--export", metavar="CSV", help="Export a results CSV to Parquet and build rollups first.")
+    parser.add_argument("--sql", help="SQL to run against the clauses, contracts, company_rollup and type_rollup views.")
+    parser.add_argument("--query", choices=sorted(canned_queries), help="Run a predefined portfolio query.")
+    args = parser.parse_args()
+
+    if args.export:
+        export_results(args.export, args.parquet_dir)
+    sql = args.sql or canned_queries.get(args.query)
+    if sql:
+        print(query(sql, args.parquet_dir).to_string(index=False))
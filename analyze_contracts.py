@@ -1,32 +1,23 @@
 import os
+from itertools import islice
 import pandas as pd
-import fitz  # PyMuPDF
-from transformers import AutoTokenizer, AutoModel
-import torch
 import torch.multiprocessing as mp
+import numpy as np
+from dedup_clauses import embed_deduplicated
+from dedup_documents import document_identity, plan_clause_embeddings
+from embedding_store import save_store
+from process_tokens import pooling_strategies
+from autotune import AdaptiveBatchSizer, load_host_config, apply_config
+from text_cache import get_text_cache
+from archive_input import is_archive, is_archive_member, iter_archive_members, read_member
 
 # Fix multiprocessing issue on macOS
 if __name__ == "__main__":
     mp.set_start_method("spawn", force=True)
 
-# Initialize LEGAL-BERT tokenizer and model
-def load_bert_model():
-    """Load LEGAL-BERT model and tokenizer."""
-    tokenizer = AutoTokenizer.from_pretrained("nlpaueb/legal-bert-base-uncased")
-    model = AutoModel.from_pretrained("nlpaueb/legal-bert-base-uncased")
-    return tokenizer, model
-
 # Define keywords for clause extraction
 keywords = ["confidentiality", "liability cap", "archiving", "data retention", "governing law", "payment terms"]
 
-def extract_text_from_pdf(pdf_path):
-    """Extract all text from a PDF file."""
-    doc = fitz.open(pdf_path)
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
-
 def find_clauses(text, keywords):
     """Extract clauses containing specific keywords."""
     clauses = []
@@ -36,50 +27,129 @@ def find_clauses(text, keywords):
                 clauses.append((keyword, line.strip()))
     return clauses
 
-def process_text_with_bert(text, tokenizer, model):
-    """Generate embeddings for text using LEGAL-BERT."""
-    tokens = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-    with torch.no_grad():
-        outputs = model(**tokens)
-    return outputs.last_hidden_state.mean(dim=1)  # Mean pooling of embeddings
-
-def analyze_contracts(base_folder, output_csv):
-    """Analyze all contracts and extract relevant clauses."""
-    results = []
-
-    # Load model and tokenizer
-    tokenizer, model = load_bert_model()
+def find_clauses_in_pages(pages, keywords):
+    """Extract keyword clauses with their 1-based page number and character offset in the page."""
+    clauses = []
+    for page_number, page_text in enumerate(pages, start=1):
+        for keyword in keywords:
+            offset = 0
+            for line in page_text.split("\n"):
+                if keyword.lower() in line.lower():
+                    clauses.append((keyword, line.strip(), page_number, offset))
+                offset += len(line) + 1
+    return clauses
 
-    # Walk through the folder structure
+def iter_contract_pdfs(base_folder):
+    """Yield (file path, company name, contract type) for every PDF in the folder structure."""
     for root, _, files in os.walk(base_folder):
         for file in files:
             if file.endswith(".pdf"):
                 file_path = os.path.join(root, file)
                 company_name = os.path.basename(root).replace("_", " ")
                 contract_type = file.split("_")[0]
+                yield file_path, company_name, contract_type
+
+def iter_contract_sources(source):
+    """Yield contracts from a folder, or (member spec, company, type, PDF bytes) streamed out of an archive."""
+    if is_archive(source):
+        yield from iter_archive_members(source)
+    else:
+        yield from iter_contract_pdfs(source)
+
+def load_contract_pages(file_path, data=None):
+    """Return the page texts and bytes (for archive members) of one contract."""
+    if data is None and is_archive_member(file_path):
+        data = read_member(file_path)
+    # Page texts come from the cache, so keyword changes don't re-parse unchanged PDFs
+    return get_text_cache().get_pages(file_path, data=data), data
+
+def clause_rows(pages, file_path, company_name, contract_type):
+    """Turn the keyword clauses found in a contract's pages into result rows."""
+    clauses = find_clauses_in_pages(pages, keywords)
+    return [{
+        "Company": company_name,
+        "Contract Type": contract_type,
+        "Clause": keyword,
+        "Content": clause,
+        "File": file_path,
+        "Page": page_number,
+        "Offset": offset
+    } for keyword, clause, page_number, offset in clauses]
 
-                print(f"Analyzing: {file_path}")
-                text = extract_text_from_pdf(file_path)
-                clauses = find_clauses(text, keywords)
-
-                for keyword, clause in clauses:
-                    # Process the clause with LEGAL-BERT
-                    embeddings = process_text_with_bert(clause, tokenizer, model)
-                    results.append({
-                        "Company": company_name,
-                        "Contract Type": contract_type,
-                        "Clause": keyword,
-                        "Content": clause,
-                        "Embedding Shape": embeddings.shape
-                    })
+def extract_contract_clauses(file_path, company_name, contract_type, data=None):
+    """Extract keyword clauses from one contract as result rows."""
+    pages, _ = load_contract_pages(file_path, data)
+    return clause_rows(pages, file_path, company_name, contract_type)
+
+def extract_contract_document(file_path, company_name, contract_type, data=None):
+    """Extract one contract's clause rows together with its byte hash and text fingerprint."""
+    pages, data = load_contract_pages(file_path, data)
+    return (file_path, clause_rows(pages, file_path, company_name, contract_type), *document_identity(pages, file_path, data))
+
+def embed_clause_rows(results, poolings=pooling_strategies, batch_sizer=None):
+    """Embed extracted clause rows and return them as a DataFrame with their pooled embeddings."""
+    # Embed one representative per group of near-duplicate clauses; each clause only masks its own company
+    embeddings, group_ids = embed_deduplicated([row["Content"] for row in results],
+                                               row_party_names=[(row["Company"],) for row in results],
+                                               poolings=poolings, batch_sizer=batch_sizer)
+    print(f"Embedded {len(set(group_ids))} unique clauses for {len(results)} extracted clauses.")
+    hidden_size = next(iter(embeddings.values())).shape[1]
+    for row, group_id in zip(results, group_ids):
+        row["Group ID"] = group_id
+        row["Embedding Shape"] = (1, hidden_size)
+    return pd.DataFrame(results), embeddings
+
+def embed_document_rows(documents, poolings=pooling_strategies, batch_sizer=None):
+    """Embed canonical documents in full and only the changed clauses of their copies and versions."""
+    results, embed_rows, source = plan_clause_embeddings(documents)
+    _, embeddings = embed_clause_rows(embed_rows, poolings, batch_sizer)
+    for row, position in zip(results, source):
+        row["Group ID"] = embed_rows[position]["Group ID"]
+        row["Embedding Shape"] = embed_rows[position]["Embedding Shape"]
+    index = np.asarray(source, dtype=np.int64)
+    return pd.DataFrame(results), {pooling: matrix[index] for pooling, matrix in embeddings.items()}
+
+def analyze_contracts(base_folder, output_csv, store_dir=None, poolings=pooling_strategies, config=None, chunk_size=16):
+    """Analyze all contracts in a folder or zip/tar archive (or a list of them) and extract relevant clauses."""
+    # Use the autotuned settings for this host unless a configuration is given
+    config = config or load_host_config()
+    apply_config(config)
+    documents = []
+
+    # Walk through the folder structure, or stream members straight out of archives
+    sources = [base_folder] if isinstance(base_folder, str) else base_folder
+    contracts = (contract for source in sources for contract in iter_contract_sources(source))
+    if config["workers"] > 1:
+        print(f"Analyzing contracts with {config['workers']} worker processes...")
+        with mp.Pool(config["workers"]) as pool:
+            # Hand contracts over in chunks so archive bytes never pile up in memory
+            while chunk := list(islice(contracts, config["workers"] * chunk_size)):
+                documents.extend(pool.starmap(extract_contract_document, chunk))
+    else:
+        for contract in contracts:
+            print(f"Analyzing: {contract[0]}")
+            documents.append(extract_contract_document(*contract))
+
+    # Copies and re-saved versions of a contract reuse the vectors of the clauses they share
+    batch_sizer = AdaptiveBatchSizer(batch_size=config["batch_size"])
+    df, embeddings = embed_document_rows(documents, poolings, batch_sizer)
 
     # Save results to CSV
-    df = pd.DataFrame(results)
     df.to_csv(output_csv, index=False)
     print(f"Results saved to {output_csv}")
 
+    # Keep every pooled view so pooling strategies can be compared without re-running the model
+    if store_dir:
+        save_store(store_dir, df, embeddings)
+
 if __name__ == "__main__":
-    base_folder = "generated_contracts"  # Folder containing the test contracts
-    output_csv = "outputs/results/contract_analysis_results.csv"
-    analyze_contracts(base_folder, output_csv)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract and embed key clauses from contract PDFs.")
+    parser.add_argument("sources", nargs="*", default=["generated_contracts"], help="Folders or zip/tar archives of contracts.")
+    parser.add_argument("--output-csv", default="outputs/results/contract_analysis_results.csv", help="Where to write the clause results.")
+    parser.add_argument("--store-dir", default="outputs/embeddings", help="Where to store mean, CLS, max and last-layers embeddings.")
+    args = parser.parse_args()
+
+    analyze_contracts(args.sources, args.output_csv, args.store_dir)
 
@@ -0,0 +1,90 @@
+import os
+import multiprocessing
+import pandas as pd
+import fitz  # PyMuPDF
+from archive_input import is_archive_member, member_separator, read_member
+
+# Highlight colours (RGB, 0-1) per tone
+tone_colors = {
+    "customer-friendly": (0.55, 0.85, 0.55),
+    "neutral": (1.0, 0.9, 0.3),
+    "supplier-friendly": (1.0, 0.55, 0.55),
+}
+
+def annotated_path(file_path, output_dir):
+    """Mirror a contract's path (or archive member spec) under the output folder."""
+    relative = os.path.splitdrive(file_path.replace(member_separator, os.sep))[1].lstrip(os.sep)
+    return os.path.join(output_dir, relative)
+
+def find_clause_rect(page, content, page_text, offset):
+    """Locate a clause line on the page, picking the occurrence its character offset points at."""
+    rects = page.search_for(content)
+    if not rects:
+        return None
+    # Identical lines on a page are found in reading order, like the extracted text; search_for ignores case, so count that way too
+    occurrence = page_text[:offset].lower().count(content.lower())
+    return rects[min(occurrence, len(rects) - 1)]
+
+def annotate_contract(file_path, clauses, output_dir):
+    """Write a copy of one contract with its clauses highlighted; only pages with hits are loaded."""
+    data = read_member(file_path) if is_archive_member(file_path) else None
+    doc = fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(file_path)
+    highlighted = 0
+    for page_number, page_clauses in clauses.groupby("Page"):
+        page = doc[int(page_number) - 1]
+        page_text = page.get_text()
+        # A line matching several keywords gets one highlight naming all its clause types
+        for offset, line_clauses in page_clauses.groupby("Offset", sort=False):
+            clause = line_clauses.iloc[0]
+            rect = find_clause_rect(page, clause.Content, page_text, int(offset))
+            if rect is None:
+                continue
+            annot = page.add_highlight_annot(rect)
+            annot.set_colors(stroke=tone_colors.get(clause.Tone, tone_colors["neutral"]))
+            annot.set_info(title=clause.Tone, content=f"{', '.join(line_clauses['Clause'].astype(str).unique())} ({clause.Tone})")
+            annot.update()
+            highlighted += len(line_clauses)
+
+    output_path = annotated_path(file_path, output_dir)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    doc.save(output_path, deflate=True)
+    doc.close()
+    return highlighted, len(clauses)
+
+def _annotate_group(args):
+    return annotate_contract(*args)
+
+def annotate_results(input_csv, output_dir="outputs/annotated", workers=None):
+    """Write highlighted copies of every contract with clauses in a results CSV, in parallel."""
+    print(f"Loading clause positions from: {input_csv}")
+    columns = ["File", "Page", "Offset", "Clause", "Content", "Tone"]
+    data = pd.read_csv(input_csv, usecols=lambda column: column in columns)
+    missing = {"File", "Page", "Offset"} - set(data.columns)
+    if missing:
+        raise ValueError(f"{input_csv} has no {', '.join(sorted(missing))} column; re-run analyze_contracts.py to record clause positions.")
+    if "Tone" not in data.columns:
+        # Imported here because validate_embeddings pulls in torch, which annotating never needs
+        from validate_embeddings import label_tone
+        data["Tone"] = data["Content"].astype(str).map(label_tone)
+    data["Content"] = data["Content"].astype(str)
+
+    groups = ((file_path, clauses, output_dir) for file_path, clauses in data.groupby("File", sort=False))
+    workers = workers or os.cpu_count()
+    print(f"Annotating {data['File'].nunique()} contracts with {workers} worker processes...")
+    highlighted = total = 0
+    with multiprocessing.Pool(workers) as pool:
+        for found, count in pool.imap_unordered(_annotate_group, groups, chunksize=16):
+            highlighted += found
+            total += count
+    print(f"Highlighted {highlighted} of {total} clauses; annotated PDFs saved to {output_dir}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write copies of the analyzed contracts with their clauses highlighted by tone.")
+    parser.add_argument("--input-csv", default="outputs/results/contract_analysis_results.csv", help="Clause results with File, Page and Offset.")
+    parser.add_argument("--output-dir", default="outputs/annotated", help="Where to write the annotated PDFs.")
+    parser.add_argument("--workers", type=int, help="Worker processes (defaults to one per CPU).")
+    args = parser.parse_args()
+
+    annotate_results(args.input_csv, args.output_dir, args.workers)
@@ -0,0 +1,92 @@
+import os
+import tarfile
+import zipfile
+
+# Archive members are addressed as "<archive path>::<member path>"
+member_separator = "::"
+
+archive_suffixes = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+def is_archive(path):
+    """Return True if the path looks like a zip or tar archive."""
+    return os.path.isfile(path) and path.lower().endswith(archive_suffixes)
+
+def is_archive_member(path):
+    """Return True if the path is an archive member spec."""
+    return member_separator in path
+
+def member_spec(archive_path, member_name):
+    """Build the spec string that addresses one archive member."""
+    return f"{archive_path}{member_separator}{member_name}"
+
+def contract_info(member_name):
+    """Derive company name and contract type from a member path, as the folder walk does."""
+    company_name = os.path.basename(os.path.dirname(member_name)).replace("_", " ")
+    contract_type = os.path.basename(member_name).split("_")[0]
+    return company_name, contract_type
+
+def _is_pdf(name):
+    return name.lower().endswith(".pdf") and not os.path.basename(name).startswith(".")
+
+def iter_archive_members(archive_path):
+    """Stream (member spec, company name, contract type, PDF bytes) out of a zip or tar archive in one pass."""
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_pdf(info.filename):
+                    yield (member_spec(archive_path, info.filename), *contract_info(info.filename), archive.read(info))
+    else:
+        # Stream mode reads compressed tars front to back without building an index
+        with tarfile.open(archive_path, "r|*") as archive:
+            for member in archive:
+                if member.isfile() and _is_pdf(member.name):
+                    yield (member_spec(archive_path, member.name), *contract_info(member.name), archive.extractfile(member).read())
+
+def iter_archive_pdfs(archive_path):
+    """Yield (member spec, company name, contract type) for every PDF in an archive, like iter_contract_pdfs."""
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            names = [info.filename for info in archive.infolist() if not info.is_dir() and _is_pdf(info.filename)]
+    else:
+        with tarfile.open(archive_path, "r:*") as archive:
+            names = [member.name for member in archive.getmembers() if member.isfile() and _is_pdf(member.name)]
+    for name in names:
+        yield (member_spec(archive_path, name), *contract_info(name))
+
+# Open archives are kept per process so repeated member reads don't re-open them
+_open_archives = {}
+
+def _read_tar_member(state, member_name):
+    """Read a tar member, scanning headers forward from the last position instead of indexing the whole archive."""
+    archive, seen = state
+    member = seen.get(member_name)
+    while member is None:
+        # Compressed tars can only seek forward cheaply, so members read in archive order cost one pass in total
+        info = archive.next()
+        if info is None:
+            raise KeyError(f"No member named {member_name!r} in the archive.")
+        seen[info.name] = info
+        if info.name == member_name:
+            member = info
+    return archive.extractfile(member).read()
+
+def read_member(spec):
+    """Read the bytes of a single archive member given its spec (random access for zip, archive order for tar)."""
+    # Reading a compressed tar out of order decompresses from the start again, so callers keep iter_archive_pdfs order
+    archive_path, member_name = spec.split(member_separator, 1)
+    key = (os.getpid(), archive_path)
+    if key not in _open_archives:
+        if zipfile.is_zipfile(archive_path):
+            _open_archives[key] = zipfile.ZipFile(archive_path)
+        else:
+            _open_archives[key] = (tarfile.open(archive_path, "r:*"), {})
+    archive = _open_archives[key]
+    if isinstance(archive, zipfile.ZipFile):
+        return archive.read(member_name)
+    return _read_tar_member(archive, member_name)
+
+if __name__ == "__main__":
+    import sys
+
+    for spec, company_name, contract_type in iter_archive_pdfs(sys.argv[1]):
+        print(f"{company_name} | {contract_type} | {spec}")
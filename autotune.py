@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import socket
+import multiprocessing
+import torch
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+autotune_path = "outputs/autotune.json"
+
+default_config = {"batch_size": 32, "intra_op_threads": torch.get_num_threads(), "inter_op_threads": 1, "workers": 1}
+
+def available_memory_fraction():
+    """Return the fraction of system memory still available, or None if it can't be measured."""
+    if psutil is not None:
+        memory = psutil.virtual_memory()
+        return memory.available / memory.total
+    try:
+        with open("/proc/meminfo") as f:
+            info = {line.split(":")[0]: int(line.split()[1]) for line in f}
+        return info["MemAvailable"] / info["MemTotal"]
+    except (OSError, KeyError, ValueError, IndexError):
+        return None
+
+class AdaptiveBatchSizer:
+    """Adjust the embedding batch size at runtime from measured latency and memory headroom."""
+
+    def __init__(self, batch_size=32, min_batch_size=1, max_batch_size=256, target_batch_seconds=2.0, min_free_memory=0.15):
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_batch_seconds = target_batch_seconds
+        self.min_free_memory = min_free_memory
+        self.best_throughput = 0.0
+
+    def record(self, batch_items, seconds):
+        """Update the batch size after a batch of batch_items took seconds to embed."""
+        throughput = batch_items / max(seconds, 1e-9)
+        free_memory = available_memory_fraction()
+
+        if (free_memory is not None and free_memory < self.min_free_memory) or seconds > self.target_batch_seconds:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif batch_items == self.batch_size and throughput >= self.best_throughput * 0.95:
+            # Keep growing while larger batches still pay off
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+        elif throughput < self.best_throughput * 0.8:
+            self.batch_size = max(self.min_batch_size, int(self.batch_size * 0.75))
+        self.best_throughput = max(self.best_throughput, throughput)
+
+def load_host_config(path=autotune_path, host=None):
+    """Return the tuned configuration for this host, falling back to the defaults."""
+    host = host or socket.gethostname()
+    if os.path.isfile(path):
+        with open(path) as f:
+            configs = json.load(f)
+        if host in configs:
+            return {**default_config, **configs[host]}
+    return dict(default_config)
+
+def save_host_config(config, path=autotune_path, host=None):
+    """Persist the tuned configuration for this host alongside other hosts' entries."""
+    host = host or socket.gethostname()
+    configs = {}
+    if os.path.isfile(path):
+        with open(path) as f:
+            configs = json.load(f)
+    configs[host] = config
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(configs, f, indent=2)
+    print(f"Saved configuration for {host} to {path}")
+
+def apply_config(config):
+    """Apply thread settings to torch in the current process."""
+    torch.set_num_threads(config["intra_op_threads"])
+    try:
+        torch.set_num_interop_threads(config["inter_op_threads"])
+    except RuntimeError:
+        # Inter-op threads can only be set before the first parallel operation
+        print("Inter-op thread count already fixed for this process; skipping.")
+
+def sample_clauses(input_csv, sample_size=256):
+    """Take a sample of real clause texts for calibration."""
+    data = pd.read_csv(input_csv, usecols=["Content"])
+    contents = data["Content"].dropna().astype(str)
+    return contents.sample(min(sample_size, len(contents)), random_state=0).tolist()
+
+def measure_embedding(texts, batch_size, repeats=2):
+    """Return embedding throughput in clauses per second for one batch size."""
+    from process_tokens import embed_texts
+
+    embed_texts(texts[:batch_size], batch_size=batch_size)  # Warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        embed_texts(texts, batch_size=batch_size)
+    return repeats * len(texts) / (time.perf_counter() - started)
+
+def _embedding_trial(inter_op_threads, intra_candidates, batch_sizes, texts, results):
+    """Run in a fresh process because inter-op threads can't change once torch has started."""
+    torch.set_num_interop_threads(inter_op_threads)
+    for intra_op_threads in intra_candidates:
+        torch.set_num_threads(intra_op_threads)
+        for batch_size in batch_sizes:
+            throughput = measure_embedding(texts, batch_size)
+            print(f"inter={inter_op_threads} intra={intra_op_threads} batch={batch_size}: {throughput:.1f} clauses/s")
+            results.append({"inter_op_threads": inter_op_threads, "intra_op_threads": intra_op_threads,
+                            "batch_size": batch_size, "throughput": throughput})
+
+def _extract_uncached(file_path, company_name, contract_type):
+    """Parse a PDF and find its clauses without the text cache, which would turn later trials into cache hits."""
+    from analyze_contracts import find_clauses_in_pages, keywords
+    from extract_text import extract_pages_from_pdf
+
+    return find_clauses_in_pages(extract_pages_from_pdf(file_path), keywords)
+
+def measure_extraction(files, workers):
+    """Return extraction throughput in contracts per second for a worker-process count."""
+    started = time.perf_counter()
+    if workers == 1:
+        for entry in files:
+            _extract_uncached(*entry)
+    else:
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            pool.starmap(_extract_uncached, files)
+    return len(files) / (time.perf_counter() - started)
+
+def autotune(input_csv, base_folder, batch_sizes=(8, 16, 32, 64), sample_size=256, max_pdfs=100):
+    """Search batch size, thread counts and worker processes, then persist the best configuration."""
+    from analyze_contracts import iter_contract_pdfs
+
+    cores = os.cpu_count() or 1
+    intra_candidates = sorted({1, max(1, cores // 4), max(1, cores // 2), cores})
+    inter_candidates = sorted({1, 2})
+    texts = sample_clauses(input_csv, sample_size)
+    print(f"Calibrating on {len(texts)} clauses with {cores} cores...")
+
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        results = manager.list()
+        for inter_op_threads in inter_candidates:
+            trial = context.Process(target=_embedding_trial, args=(inter_op_threads, intra_candidates, batch_sizes, texts, results))
+            trial.start()
+            trial.join()
+        results = list(results)
+    best = max(results, key=lambda result: result["throughput"])
+
+    # Extraction is pure PyMuPDF work, so tune its process count separately
+    files = sorted(iter_contract_pdfs(base_folder))[:max_pdfs]
+    worker_candidates = sorted({1, max(1, cores // 2), cores})
+    extraction = {workers: measure_extraction(files, workers) for workers in worker_candidates}
+    for workers, throughput in extraction.items():
+        print(f"workers={workers}: {throughput:.1f} contracts/s")
+
+    config = {key: best[key] for key in ("batch_size", "intra_op_threads", "inter_op_threads")}
+    config["workers"] = max(extraction, key=extraction.get)
+    config["throughput"] = best["throughput"]
+    save_host_config(config)
+    return config
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calibrate batch size, thread counts and worker processes for this host.")
+    parser.add_argument("--input-csv", default="outputs/results/contract_analysis_results.csv", help="Clauses to sample for calibration.")
+    parser.add_argument("--base-folder", default="generated_contracts", help="Contracts to sample for extraction timing.")
+    parser.add_argument("--sample-size", type=int, default=256, help="Number of clauses to calibrate on.")
+    args = parser.parse_args()
+
+    print(autotune(args.input_csv, args.base_folder, sample_size=args.sample_size))
@@ -0,0 +1,111 @@
+import re
+import numpy as np
+import pandas as pd
+from generate_random_contracts2 import clauses as clause_templates
+from analyze_contracts import iter_contract_pdfs
+from text_cache import get_text_cache
+from embedding_cache import EmbeddingCache
+from process_tokens import embed_texts
+
+# Representative values used to fill template placeholders
+example_values = {
+    "date": "January 1, 2025",
+    "company": "the Client",
+    "counterparty": "the Consultant",
+    "services_description": "consulting, advisory, and technical services",
+    "days": 30,
+    "amount": 10000,
+    "currency": "USD",
+    "years": 3,
+    "jurisdiction": "Sweden",
+    "method": "arbitration",
+}
+
+_sentence_boundary = re.compile(r"(?<=[.!?])\s+(?=[A-Z(\"'])")
+
+def split_sentences(text, min_words=4):
+    """Split extracted PDF text into sentences, joining lines that were wrapped by the layout."""
+    sentences = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        for sentence in _sentence_boundary.split(paragraph):
+            if len(sentence.split()) >= min_words:
+                sentences.append(sentence)
+    return sentences
+
+def load_clause_templates(templates=clause_templates):
+    """Return {clause type: [template text]} with placeholders filled in."""
+    return {clause_type: [template.format(**example_values) for template in variants]
+            for clause_type, variants in templates.items()}
+
+def normalize_rows(matrix):
+    """Scale each row to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+def build_prototypes(cache, templates=None):
+    """Embed the templates and average them into one unit prototype vector per clause type."""
+    templates = templates or load_clause_templates()
+    clause_types = sorted(templates)
+    prototypes = np.vstack([normalize_rows(cache.embed(templates[t])).mean(axis=0) for t in clause_types])
+    return clause_types, normalize_rows(prototypes)
+
+def classify_embeddings(embeddings, clause_types, prototypes, threshold=0.75):
+    """Score embeddings against all prototypes with one matrix multiply and keep confident matches."""
+    scores = normalize_rows(embeddings) @ prototypes.T
+    best = scores.argmax(axis=1)
+    confidence = scores[np.arange(len(scores)), best]
+    labels = np.where(confidence >= threshold, np.array(clause_types, dtype=object)[best], None)
+    return labels, confidence
+
+def iter_sentence_rows(base_folder, chunk_size=10000):
+    """Yield the corpus's sentence rows in chunks, large enough for full batches but bounded in memory."""
+    rows = []
+    for file_path, company_name, contract_type in iter_contract_pdfs(base_folder):
+        print(f"Splitting: {file_path}")
+        for sentence in split_sentences(get_text_cache().get_text(file_path)):
+            rows.append({"Company": company_name, "Contract Type": contract_type, "File": file_path, "Content": sentence})
+        if len(rows) >= chunk_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+def classify_rows(rows, clause_types, prototypes, threshold=0.75, batch_size=64):
+    """Embed one chunk of sentence rows and return those confidently matching a clause type."""
+    df = pd.DataFrame(rows)
+    # Boilerplate repeats across contracts, so each distinct sentence is embedded once per chunk
+    unique, inverse = np.unique(df["Content"].to_numpy(dtype=str), return_inverse=True)
+    embeddings = embed_texts(unique.tolist(), batch_size=batch_size)[inverse]
+    labels, confidence = classify_embeddings(embeddings, clause_types, prototypes, threshold)
+    df["Clause"] = labels
+    df["Confidence"] = confidence
+    return df[df["Clause"].notna()]
+
+def classify_contracts(base_folder, output_csv, cache_path="outputs/cache/sentence_embeddings.npz", threshold=0.75, batch_size=64,
+                       chunk_size=10000):
+    """Classify every sentence of every contract into clause types, writing results chunk by chunk."""
+    # Only the templates go through the persistent cache; corpus sentences would grow it without bound
+    cache = EmbeddingCache(cache_path)
+    clause_types, prototypes = build_prototypes(cache)
+    cache.save()
+
+    sentences = classified = 0
+    for rows in iter_sentence_rows(base_folder, chunk_size):
+        df = classify_rows(rows, clause_types, prototypes, threshold, batch_size)
+        df.to_csv(output_csv, mode="w" if sentences == 0 else "a", header=sentences == 0, index=False)
+        sentences += len(rows)
+        classified += len(df)
+    print(f"Classified {classified} of {sentences} sentences. Results saved to {output_csv}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Classify contract sentences into clause types with LEGAL-BERT prototypes.")
+    parser.add_argument("--base-folder", default="generated_contracts", help="Folder containing the contracts.")
+    parser.add_argument("--output-csv", default="outputs/results/classified_clauses.csv", help="Where to write the classified sentences.")
+    parser.add_argument("--threshold", type=float, default=0.75, help="Minimum cosine similarity to a prototype.")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Sentences embedded and written at a time.")
+    args = parser.parse_args()
+
+    classify_contracts(args.base_folder, args.output_csv, threshold=args.threshold, chunk_size=args.chunk_size)
@@ -0,0 +1,138 @@
+import re
+import zlib
+from functools import lru_cache
+import numpy as np
+from process_tokens import embed_texts_pooled
+
+currency_codes = ["USD", "EUR", "GBP", "SEK", "CAD"]
+month_names = ["january", "february", "march", "april", "may", "june", "july",
+               "august", "september", "october", "november", "december"]
+
+_number_pattern = re.compile(r"\d[\d,.]*")
+_currency_pattern = re.compile(r"\b(" + "|".join(currency_codes) + r")\b", re.IGNORECASE)
+_month_pattern = re.compile(r"\b(" + "|".join(month_names) + r")\b")
+_word_pattern = re.compile(r"[a-z<>]+")
+
+@lru_cache(maxsize=4096)
+def party_pattern(party_names):
+    """Compile one case-insensitive alternation over a tuple of party names, or None if there are none."""
+    # Longest names first so "Smith and Sons Ltd" wins over "Smith and Sons"
+    names = sorted({name for name in party_names if name}, key=len, reverse=True)
+    return re.compile("|".join(re.escape(name) for name in names), re.IGNORECASE) if names else None
+
+def normalize_clause(text, party_names=()):
+    """Lowercase a clause and mask numbers, currencies, dates and party names."""
+    normalized = text
+    pattern = party_pattern(tuple(party_names))
+    if pattern is not None:
+        normalized = pattern.sub(" <party> ", normalized)
+    normalized = _currency_pattern.sub(" <cur> ", normalized)
+    normalized = _number_pattern.sub(" <num> ", normalized)
+    normalized = _month_pattern.sub(" <month> ", normalized.lower())
+    return " ".join(normalized.split())
+
+def shingle(text, size=3):
+    """Return the set of word n-gram hashes for a normalized clause."""
+    words = _word_pattern.findall(text)
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    """MinHash signatures using a multiply-shift hash family."""
+
+    def __init__(self, num_perm=64, seed=42):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles):
+        """Return the minimum hash per permutation for a set of shingle hashes."""
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        # uint64 arithmetic wraps, which is exactly the multiply-shift scheme
+        hashed = (values[:, None] * self.a[None, :] + self.b[None, :]) >> np.uint64(32)
+        return hashed.min(axis=0)
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+def group_signatures(signatures, threshold=0.8, bands=16):
+    """Group MinHash signatures whose estimated Jaccard similarity reaches the threshold using LSH banding."""
+    n = len(signatures)
+    parents = list(range(n))
+    if n == 0:
+        return []
+    rows = signatures.shape[1] // bands
+
+    for band in range(bands):
+        buckets = {}
+        band_slice = signatures[:, band * rows:(band + 1) * rows]
+        for i in range(n):
+            buckets.setdefault(band_slice[i].tobytes(), []).append(i)
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                root_first, root_other = _find(parents, first), _find(parents, other)
+                if root_first == root_other:
+                    continue
+                # Confirm the candidate pair so band collisions don't chain unrelated clauses
+                if np.mean(signatures[first] == signatures[other]) >= threshold:
+                    parents[max(root_first, root_other)] = min(root_first, root_other)
+
+    # Number groups in order of first appearance
+    group_ids, roots = [], {}
+    for i in range(n):
+        root = _find(parents, i)
+        group_ids.append(roots.setdefault(root, len(roots)))
+    return group_ids
+
+def dedupe_clauses(texts, party_names=(), threshold=0.8, num_perm=64, bands=16, row_party_names=None):
+    """Assign a near-duplicate group id to each clause and pick one representative per group."""
+    hasher = MinHasher(num_perm=num_perm)
+    # Per-clause names keep the masking cost independent of how many companies are in the run
+    if row_party_names is None:
+        row_party_names = [party_names] * len(texts)
+    normalized = [normalize_clause(text, names) for text, names in zip(texts, row_party_names)]
+    if not normalized:
+        return [], []
+
+    # Identical normalized text needs no signature comparison
+    unique_index = {}
+    for text in normalized:
+        unique_index.setdefault(text, len(unique_index))
+    unique_texts = list(unique_index)
+    signatures = np.vstack([hasher.signature(shingle(text)) for text in unique_texts])
+    unique_groups = group_signatures(signatures, threshold=threshold, bands=bands)
+
+    group_ids = [unique_groups[unique_index[text]] for text in normalized]
+    representatives = {}
+    for i, group_id in enumerate(group_ids):
+        representatives.setdefault(group_id, i)
+    return group_ids, [representatives[g] for g in range(len(representatives))]
+
+def embed_deduplicated(texts, party_names=(), threshold=0.8, batch_size=32, poolings=("mean",), batch_sizer=None,
+                       row_party_names=None):
+    """Embed one representative per near-duplicate group and fan the vectors back out."""
+    group_ids, representatives = dedupe_clauses(texts, party_names, threshold=threshold, row_party_names=row_party_names)
+    pooled = embed_texts_pooled([texts[i] for i in representatives], poolings, batch_size=batch_size, batch_sizer=batch_sizer)
+    if not group_ids:
+        return pooled, group_ids
+    index = np.asarray(group_ids)
+    return {pooling: vectors[index] for pooling, vectors in pooled.items()}, group_ids
+
+# Test deduplication
+if __name__ == "__main__":
+    sample = [
+        "The total liability of the Consultant is capped at 12000 USD, except in cases of gross negligence.",
+        "The total liability of the Consultant is capped at 7500 EUR, except in cases of gross negligence.",
+        "Invoices will be paid within 30 days. Late payments will incur interest at 1.5% per month.",
+        "Invoices will be paid within 60 days. Late payments will incur interest at 1.5% per month.",
+        "Any disputes will be resolved in accordance with the laws of Sweden in arbitration.",
+    ]
+    group_ids, representatives = dedupe_clauses(sample)
+    print("Group IDs:", group_ids)
+    print(f"{len(representatives)} representatives for {len(sample)} clauses")
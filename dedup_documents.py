@@ -0,0 +1,62 @@
+import numpy as np
+from dedup_clauses import MinHasher, group_signatures, normalize_clause, shingle
+from text_cache import content_hash, get_text_cache
+
+# Whole documents are long, so use more permutations and longer shingles than for clauses
+document_hasher = MinHasher(num_perm=128)
+
+def document_identity(pages, file_path=None, data=None, shingle_size=5):
+    """Return (byte hash, MinHash signature of the normalized text) for one contract."""
+    digest = content_hash(data) if data is not None else get_text_cache().file_hash(file_path)
+    signature = document_hasher.signature(shingle(normalize_clause("\n".join(pages)), shingle_size))
+    return digest, signature
+
+def group_documents(digests, signatures, threshold=0.8, bands=32):
+    """Group exact copies by byte hash and near-versions by text fingerprint; return (group ids, canonical index, relation)."""
+    if not digests:
+        return [], [], []
+    first_seen = {}
+    for i, digest in enumerate(digests):
+        first_seen.setdefault(digest, i)
+    # Only one signature per distinct file needs comparing
+    firsts = list(first_seen.values())
+    fuzzy_groups = group_signatures(np.vstack([signatures[i] for i in firsts]), threshold=threshold, bands=bands)
+
+    group_of_digest, canonical_of_group = {}, {}
+    for i, group_id in zip(firsts, fuzzy_groups):
+        group_of_digest[digests[i]] = group_id
+        # The first document seen is canonical, so it always precedes its copies and versions
+        canonical_of_group.setdefault(group_id, i)
+
+    group_ids, canonical, relations = [], [], []
+    for i, digest in enumerate(digests):
+        group_id = group_of_digest[digest]
+        c = canonical_of_group[group_id]
+        group_ids.append(group_id)
+        canonical.append(c)
+        relations.append("canonical" if i == c else "copy" if digests[c] == digest else "version")
+    return group_ids, canonical, relations
+
+def plan_clause_embeddings(documents, threshold=0.8):
+    """Split (file, rows, byte hash, signature) documents into all rows, the rows to embed, and each row's source position."""
+    group_ids, canonical, relations = group_documents([d[2] for d in documents], [d[3] for d in documents], threshold)
+    results, embed_rows, source = [], [], []
+    canonical_clauses = {}
+    for i, (_, rows, _, _) in enumerate(documents):
+        c = canonical[i]
+        known = canonical_clauses.setdefault(c, {})
+        for row in rows:
+            row["Document Group"] = group_ids[i]
+            row["Document Relation"] = relations[i]
+            row["Canonical File"] = documents[c][0]
+            # Clauses a copy or version shares word for word with its canonical keep the canonical's vector
+            if row["Content"] not in known:
+                known[row["Content"]] = len(embed_rows)
+                embed_rows.append(row)
+            source.append(known[row["Content"]])
+            results.append(row)
+
+    copies, versions = relations.count("copy"), relations.count("version")
+    print(f"{len(documents)} documents in {len(set(group_ids))} groups ({copies} exact copies, {versions} versions); "
+          f"{len(embed_rows)} of {len(results)} clauses need embedding.")
+    return results, embed_rows, source
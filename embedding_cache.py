@@ -0,0 +1,68 @@
+import os
+import hashlib
+import numpy as np
+from process_tokens import embed_texts_pooled
+from token_cache import default_token_cache_dir
+
+def text_key(text):
+    """Return the cache key for a piece of text."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """Persistent text-hash to embedding cache stored as a single .npz file."""
+
+    def __init__(self, path=None, depth=None, max_length=512, pooling="mean", token_cache_dir=default_token_cache_dir):
+        # Vectors from different depths, lengths or poolings aren't comparable, so give each its own cache file
+        self.path = path
+        self.depth = depth
+        self.max_length = max_length
+        self.pooling = pooling
+        self.token_cache_dir = token_cache_dir
+        self.index = {}
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.pending = []
+        if path and os.path.isfile(path):
+            data = np.load(path)
+            self.index = {key: i for i, key in enumerate(data["keys"].tolist())}
+            self.vectors = data["vectors"]
+
+    def __len__(self):
+        return len(self.index) + len(self.pending)
+
+    def _flush_pending(self):
+        if self.pending:
+            new_vectors = np.vstack(self.pending)
+            self.vectors = new_vectors if self.vectors.size == 0 else np.vstack([self.vectors, new_vectors])
+            self.pending = []
+
+    def embed(self, texts, batch_size=32):
+        """Return a (n, hidden_size) matrix for texts, embedding only those not cached yet."""
+        keys = [text_key(text) for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.index and key not in missing:
+                missing[key] = text
+
+        if missing:
+            print(f"Embedding {len(missing)} uncached texts ({len(texts) - len(missing)} cache hits)...")
+            new_vectors = embed_texts_pooled(list(missing.values()), (self.pooling,), batch_size=batch_size,
+                                             max_length=self.max_length, depth=self.depth,
+                                             token_cache_dir=self.token_cache_dir)[self.pooling]
+            offset = len(self.index)
+            for i, key in enumerate(missing):
+                self.index[key] = offset + i
+            self.pending.append(new_vectors)
+
+        self._flush_pending()
+        if not keys:
+            return np.empty((0, self.vectors.shape[1] if self.vectors.ndim == 2 else 0), dtype=np.float32)
+        return self.vectors[[self.index[key] for key in keys]]
+
+    def save(self):
+        """Write the cache back to disk."""
+        if not self.path:
+            return
+        self._flush_pending()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        keys = np.array(sorted(self.index, key=self.index.get))
+        np.savez(self.path, keys=keys, vectors=self.vectors)
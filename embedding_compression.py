@@ -0,0 +1,179 @@
+import os
+import numpy as np
+import pandas as pd
+from embedding_store import load_store
+
+def normalize_rows(matrix):
+    """Scale each row to unit length so dot products are cosine similarities."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+def fit_pca(matrix, n_components, sample_size=50000, seed=0):
+    """Fit PCA on a sample of rows and return (mean, components)."""
+    rng = np.random.default_rng(seed)
+    sample = matrix[rng.choice(len(matrix), min(sample_size, len(matrix)), replace=False)]
+    mean = sample.mean(axis=0)
+    _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+    return mean.astype(np.float32), vt[:n_components].astype(np.float32)
+
+def pca_transform(matrix, mean, components):
+    """Project rows onto the fitted principal components."""
+    return (np.asarray(matrix, dtype=np.float32) - mean) @ components.T
+
+def kmeans(data, n_clusters, iterations=20, seed=0):
+    """Plain Lloyd k-means returning the centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = np.array(data[rng.choice(len(data), min(n_clusters, len(data)), replace=False)], dtype=np.float32)
+    for _ in range(iterations):
+        assignment = assign_centroids(data, centroids)
+        # Sum every cluster's members in one pass; empty clusters keep their previous centroid
+        counts = np.bincount(assignment, minlength=len(centroids))
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+def assign_centroids(data, centroids, batch_size=65536):
+    """Return the index of the nearest centroid for each row."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignment = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), batch_size):
+        batch = data[start:start + batch_size]
+        # ||x||^2 is constant per row, so it doesn't change the argmin
+        assignment[start:start + batch_size] = (centroid_norms[None, :] - 2.0 * batch @ centroids.T).argmin(axis=1)
+    return assignment
+
+class ProductQuantizer:
+    """Product quantization with uint8 codes and asymmetric distance computation."""
+
+    def __init__(self, codebooks):
+        self.codebooks = codebooks  # (n_subvectors, n_centroids, sub_dim)
+        self.n_subvectors, self.n_centroids, self.sub_dim = codebooks.shape
+
+    @classmethod
+    def train(cls, matrix, n_subvectors=96, n_centroids=256, sample_size=50000, iterations=20, seed=0):
+        """Learn one k-means codebook per subvector from a sample of rows."""
+        dim = matrix.shape[1]
+        if dim % n_subvectors:
+            raise ValueError(f"Dimension {dim} is not divisible by {n_subvectors} subvectors.")
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(matrix[rng.choice(len(matrix), min(sample_size, len(matrix)), replace=False)], dtype=np.float32)
+        sub_dim = dim // n_subvectors
+        # Small stores can't fill 256 centroids; padding with zero vectors would let them win in encode
+        n_centroids = min(n_centroids, len(sample))
+        codebooks = np.zeros((n_subvectors, n_centroids, sub_dim), dtype=np.float32)
+        for m in range(n_subvectors):
+            codebooks[m] = kmeans(sample[:, m * sub_dim:(m + 1) * sub_dim], n_centroids, iterations, seed + m)
+        return cls(codebooks)
+
+    def encode(self, matrix):
+        """Return (n, n_subvectors) uint8 codes."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        codes = np.empty((len(matrix), self.n_subvectors), dtype=np.uint8)
+        for m in range(self.n_subvectors):
+            codes[:, m] = assign_centroids(matrix[:, m * self.sub_dim:(m + 1) * self.sub_dim], self.codebooks[m])
+        return codes
+
+    def decode(self, codes):
+        """Reconstruct approximate float32 vectors from codes."""
+        return np.hstack([self.codebooks[m][codes[:, m]] for m in range(self.n_subvectors)])
+
+    def adc_scores(self, query, codes):
+        """Inner products between one full-precision query and all encoded rows via lookup tables."""
+        query = np.asarray(query, dtype=np.float32).reshape(self.n_subvectors, self.sub_dim)
+        tables = np.einsum("md,mkd->mk", query, self.codebooks)
+        return tables[np.arange(self.n_subvectors)[None, :], codes].sum(axis=1)
+
+def compress_store(store_dir, pooling="mean", method="pq", n_components=128, n_subvectors=96):
+    """Write a compressed copy of a pooling's vectors next to the full-precision matrix."""
+    _, matrix = load_store(store_dir, pooling)
+    vectors = normalize_rows(matrix)
+    if method == "float16":
+        path = os.path.join(store_dir, f"{pooling}.float16.npy")
+        np.save(path, vectors.astype(np.float16))
+    elif method == "pca":
+        mean, components = fit_pca(vectors, n_components)
+        path = os.path.join(store_dir, f"{pooling}.pca.npz")
+        np.savez(path, mean=mean, components=components, reduced=pca_transform(vectors, mean, components).astype(np.float16))
+    elif method == "pq":
+        quantizer = ProductQuantizer.train(vectors, n_subvectors)
+        path = os.path.join(store_dir, f"{pooling}.pq.npz")
+        np.savez(path, codebooks=quantizer.codebooks, codes=quantizer.encode(vectors))
+    else:
+        raise ValueError(f"Unknown compression method: {method}. Choose from float16, pca or pq.")
+    print(f"Compressed {pooling} embeddings ({method}) saved to {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    return path
+
+def load_compressed(store_dir, pooling="mean", method="float16"):
+    """Load a compressed representation and return decoded float32 vectors, unit-normalized as compress_store stored them."""
+    if method == "float16":
+        return np.load(os.path.join(store_dir, f"{pooling}.float16.npy")).astype(np.float32)
+    if method == "pca":
+        data = np.load(os.path.join(store_dir, f"{pooling}.pca.npz"))
+        return data["reduced"].astype(np.float32) @ data["components"] + data["mean"]
+    if method == "pq":
+        data = np.load(os.path.join(store_dir, f"{pooling}.pq.npz"))
+        return ProductQuantizer(data["codebooks"]).decode(data["codes"])
+    raise ValueError(f"Unknown compression method: {method}. Choose from float16, pca or pq.")
+
+def top_k(scores, k):
+    """Return the indices of the k highest scores in each row."""
+    k = min(k, scores.shape[1])
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+def recall_report(matrix, pca_components=(64, 128, 256), pq_subvectors=(48, 96, 192), k=10, n_queries=200, seed=0):
+    """Measure how much top-k cosine neighbour recall each compression setting loses against full vectors."""
+    vectors = normalize_rows(matrix)
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(vectors), min(n_queries, len(vectors)), replace=False)
+    exact = top_k(vectors[queries] @ vectors.T, k)
+
+    def recall(approx):
+        return np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)])
+
+    dim = vectors.shape[1]
+    rows = [{"Setting": "float32", "Bytes per Vector": dim * 4, f"Recall@{k}": 1.0}]
+
+    half = vectors.astype(np.float16)
+    rows.append({"Setting": "float16", "Bytes per Vector": dim * 2,
+                 f"Recall@{k}": recall(top_k(half[queries].astype(np.float32) @ half.T.astype(np.float32), k))})
+
+    for n_components in pca_components:
+        if n_components >= dim:
+            continue
+        mean, components = fit_pca(vectors, n_components)
+        reduced = normalize_rows(pca_transform(vectors, mean, components).astype(np.float16))
+        rows.append({"Setting": f"pca-{n_components} (float16)", "Bytes per Vector": n_components * 2,
+                     f"Recall@{k}": recall(top_k(reduced[queries] @ reduced.T, k))})
+
+    for n_subvectors in pq_subvectors:
+        if dim % n_subvectors:
+            continue
+        quantizer = ProductQuantizer.train(vectors, n_subvectors)
+        codes = quantizer.encode(vectors)
+        # Asymmetric: full-precision queries against encoded database vectors
+        scores = np.vstack([quantizer.adc_scores(vectors[q], codes) for q in queries])
+        rows.append({"Setting": f"pq-{n_subvectors}x8bit", "Bytes per Vector": n_subvectors,
+                     f"Recall@{k}": recall(top_k(scores, k))})
+
+    report = pd.DataFrame(rows)
+    report["Compression"] = (dim * 4) / report["Bytes per Vector"]
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compress stored clause embeddings and report the recall cost.")
+    parser.add_argument("--store-dir", default="outputs/embeddings", help="Embedding store to compress.")
+    parser.add_argument("--pooling", default="mean", help="Pooling strategy to compress.")
+    parser.add_argument("--method", choices=["float16", "pca", "pq"], help="Write this compressed representation.")
+    parser.add_argument("--report", action="store_true", help="Print top-k recall for each compression setting.")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query in the recall report.")
+    args = parser.parse_args()
+
+    if args.method:
+        compress_store(args.store_dir, args.pooling, args.method)
+    if args.report:
+        _, matrix = load_store(args.store_dir, args.pooling)
+        print(recall_report(matrix, k=args.k).to_string(index=False))
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+import numpy as np
+from process_tokens import get_model, embed_texts
+from analyze_contracts import find_clauses, keywords
+from text_cache import get_text_cache
+from validate_embeddings import label_tone
+
+class MicroBatcher:
+    """Merge concurrent embedding requests into dynamic micro-batches."""
+
+    def __init__(self, max_batch_size=32, max_wait_ms=10, latency_window=1000):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = queue.Queue()
+        self.latencies = deque(maxlen=latency_window)
+        self.batch_sizes = deque(maxlen=latency_window)
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, text):
+        """Queue a single text and return a Future resolving to its embedding."""
+        future = Future()
+        self.requests.put((text, future, time.perf_counter()))
+        return future
+
+    def embed(self, texts):
+        """Embed texts through the shared batch queue and wait for the results."""
+        futures = [self.submit(text) for text in texts]
+        return np.vstack([future.result() for future in futures]) if futures else np.empty((0, 0), dtype=np.float32)
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the batch is full or the deadline passes."""
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _, _ in batch]
+            try:
+                # Request texts are rarely repeated, so they skip the on-disk token cache
+                vectors = embed_texts(texts, batch_size=len(texts), token_cache_dir=None)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            with self.lock:
+                self.batch_sizes.append(len(batch))
+                for (_, future, queued), vector in zip(batch, vectors):
+                    self.latencies.append((finished - queued) * 1000.0)
+                    future.set_result(vector)
+
+    def stats(self):
+        """Return queue depth, batch sizes and latency percentiles in milliseconds."""
+        with self.lock:
+            latencies = np.array(self.latencies, dtype=np.float64)
+            batch_sizes = np.array(self.batch_sizes, dtype=np.float64)
+        stats = {"queue_depth": self.requests.qsize(), "requests_seen": int(latencies.size)}
+        if latencies.size:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            stats.update({"latency_ms_p50": p50, "latency_ms_p95": p95, "latency_ms_p99": p99,
+                          "mean_batch_size": float(batch_sizes.mean())})
+        return stats
+
+def analyze_clause(batcher, text):
+    """Embed a single clause and label its tone."""
+    embedding = batcher.embed([text])[0]
+    return {"content": text, "tone": label_tone(text), "embedding": embedding.tolist()}
+
+def analyze_pdf(batcher, pdf_path, include_embeddings=False):
+    """Extract keyword clauses from a PDF and analyze them in one micro-batch round."""
+    if not os.path.isfile(pdf_path):
+        raise FileNotFoundError(f"The file '{pdf_path}' does not exist.")
+    text = get_text_cache().get_text(pdf_path)
+    clauses = find_clauses(text, keywords)
+    embeddings = batcher.embed([clause for _, clause in clauses])
+
+    results = []
+    for (keyword, clause), embedding in zip(clauses, embeddings):
+        result = {"clause": keyword, "content": clause, "tone": label_tone(clause)}
+        if include_embeddings:
+            result["embedding"] = embedding.tolist()
+        results.append(result)
+    return {"path": pdf_path, "clauses": results}
+
+def require_text(payload, field):
+    """Return payload[field] if it is a non-empty string, else raise ValueError."""
+    value = payload[field]
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"'{field}' must be a non-empty string.")
+    return value
+
+def require_texts(payload, field="texts"):
+    """Return payload[field] if it is a non-empty list of strings, else raise ValueError."""
+    texts = payload[field]
+    # Check here, since a bad text inside the batcher would fail every request sharing its micro-batch
+    if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+        raise ValueError(f"'{field}' must be a non-empty list of strings.")
+    return texts
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints for embedding and clause analysis."""
+
+    batcher = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) pair
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix-socket"
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.batcher.stats())
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+            if not isinstance(payload, dict):
+                raise ValueError("Request body must be a JSON object.")
+            if self.path == "/embed":
+                embeddings = self.batcher.embed(require_texts(payload))
+                self._send_json(200, {"embeddings": embeddings.tolist()})
+            elif self.path == "/analyze-clause":
+                self._send_json(200, analyze_clause(self.batcher, require_text(payload, "text")))
+            elif self.path == "/analyze-pdf":
+                self._send_json(200, analyze_pdf(self.batcher, require_text(payload, "path"), bool(payload.get("include_embeddings", False))))
+            else:
+                self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+        except FileNotFoundError as e:
+            self._send_json(404, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+def serve(host="127.0.0.1", port=8765, unix_socket=None, max_batch_size=32, max_wait_ms=10):
+    """Start the embedding service on a TCP port or a Unix socket."""
+    # Load the model before accepting requests so the first caller doesn't pay the cold start
+    print("Loading LEGAL-BERT model...")
+    get_model()
+    EmbeddingRequestHandler.batcher = MicroBatcher(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, EmbeddingRequestHandler)
+        print(f"Serving on unix socket {unix_socket}")
+    else:
+        server = ThreadingHTTPServer((host, port), EmbeddingRequestHandler)
+        print(f"Serving on http://{host}:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down.")
+    finally:
+        server.server_close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve LEGAL-BERT embeddings and clause analysis over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind the HTTP server to.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to bind the HTTP server to.")
+    parser.add_argument("--unix-socket", help="Serve on this Unix socket path instead of TCP.")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="Largest micro-batch sent to the model.")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="Longest a request waits for a batch to fill.")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.unix_socket, args.max_batch_size, args.max_wait_ms)
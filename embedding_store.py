@@ -0,0 +1,111 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+def save_store(store_dir, metadata, embeddings):
+    """Save clause metadata and one float32 matrix per pooling strategy side by side."""
+    os.makedirs(store_dir, exist_ok=True)
+    metadata.to_csv(os.path.join(store_dir, "metadata.csv"), index=False)
+
+    for pooling, matrix in embeddings.items():
+        if len(matrix) != len(metadata):
+            raise ValueError(f"Pooling '{pooling}' has {len(matrix)} rows but metadata has {len(metadata)}.")
+        np.save(os.path.join(store_dir, f"{pooling}.npy"), np.asarray(matrix, dtype=np.float32))
+
+    write_store_info(store_dir, embeddings, len(metadata))
+    print(f"Embedding store saved to {store_dir} ({', '.join(sorted(embeddings))})")
+
+def write_store_info(store_dir, poolings, rows):
+    """Write the store.json that marks a store as complete."""
+    with open(os.path.join(store_dir, "store.json"), "w") as f:
+        json.dump({"poolings": sorted(poolings), "rows": rows}, f, indent=2)
+
+def create_store_matrix(store_dir, pooling, rows, dim):
+    """Preallocate a pooling's float32 matrix on disk and return it as a writable memmap."""
+    os.makedirs(store_dir, exist_ok=True)
+    return np.lib.format.open_memmap(os.path.join(store_dir, f"{pooling}.npy"), mode="w+", dtype=np.float32, shape=(rows, dim))
+
+def _append_npy(path, matrix):
+    """Append rows to a 2-D .npy file in place by rewriting its header shape."""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        header_end = f.tell()
+        if fortran_order or dtype != np.float32 or shape[1:] != matrix.shape[1:]:
+            raise ValueError(f"Cannot append {matrix.shape} float32 rows to {path} ({shape}, {dtype}).")
+
+        # Recent numpy versions leave room in the header for the row count to grow
+        preamble = 8 + (2 if version == (1, 0) else 4)
+        header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (shape[0] + len(matrix),) + shape[1:]})
+        if len(header) + 1 > header_end - preamble:
+            f.close()
+            np.save(path, np.vstack([np.load(path), matrix]))
+            return
+        f.seek(preamble)
+        f.write((header.ljust(header_end - preamble - 1) + "\n").encode("latin1"))
+        f.seek(0, os.SEEK_END)
+        f.write(matrix.tobytes())
+
+def append_store(store_dir, metadata, embeddings):
+    """Append clause metadata and embeddings to an existing store, creating it if needed."""
+    if not os.path.isfile(os.path.join(store_dir, "store.json")):
+        save_store(store_dir, metadata, embeddings)
+        return
+
+    with open(os.path.join(store_dir, "store.json")) as f:
+        info = json.load(f)
+    if sorted(embeddings) != info["poolings"]:
+        raise ValueError(f"Store {store_dir} holds {info['poolings']}, got {sorted(embeddings)}.")
+
+    # Keep the existing column order so the CSV stays rectangular
+    metadata_path = os.path.join(store_dir, "metadata.csv")
+    columns = pd.read_csv(metadata_path, nrows=0).columns
+    metadata.reindex(columns=columns).to_csv(metadata_path, mode="a", header=False, index=False)
+    for pooling, matrix in embeddings.items():
+        _append_npy(os.path.join(store_dir, f"{pooling}.npy"), matrix)
+
+    info["rows"] += len(metadata)
+    with open(os.path.join(store_dir, "store.json"), "w") as f:
+        json.dump(info, f, indent=2)
+
+def replace_store_rows(store_dir, column, values, metadata, embeddings):
+    """Drop the rows whose `column` is in `values`, then add the new rows; rewrites the whole store."""
+    if not os.path.isfile(os.path.join(store_dir, "store.json")):
+        if metadata is not None:
+            save_store(store_dir, metadata, embeddings)
+        return
+
+    existing = pd.read_csv(os.path.join(store_dir, "metadata.csv"))
+    keep = (~existing[column].isin(values)).to_numpy() if column in existing.columns else np.ones(len(existing), dtype=bool)
+    combined = pd.concat([existing[keep], metadata.reindex(columns=existing.columns)], ignore_index=True) if metadata is not None else existing[keep]
+    matrices = {}
+    for pooling in embeddings if embeddings is not None else list_poolings(store_dir):
+        stored = np.load(os.path.join(store_dir, f"{pooling}.npy"), mmap_mode="r")
+        # No embeddings means the matching rows are only removed
+        new_rows = embeddings[pooling] if embeddings is not None else np.empty((0, stored.shape[1]))
+        matrices[pooling] = np.vstack([stored[keep], np.asarray(new_rows, dtype=np.float32)])
+        del stored
+    save_store(store_dir, combined, matrices)
+
+def list_poolings(store_dir):
+    """Return the pooling strategies stored in an embedding store."""
+    with open(os.path.join(store_dir, "store.json")) as f:
+        return json.load(f)["poolings"]
+
+def load_store(store_dir, pooling="mean", mmap_mode="r"):
+    """Load clause metadata and the embedding matrix for one pooling strategy."""
+    metadata = pd.read_csv(os.path.join(store_dir, "metadata.csv"))
+    matrix_path = os.path.join(store_dir, f"{pooling}.npy")
+    if not os.path.isfile(matrix_path):
+        raise FileNotFoundError(f"No '{pooling}' embeddings in {store_dir}. Available: {list_poolings(store_dir)}")
+    return metadata, np.load(matrix_path, mmap_mode=mmap_mode)
+
+# Test loading
+if __name__ == "__main__":
+    store_dir = "outputs/embeddings"
+    for pooling in list_poolings(store_dir):
+        metadata, matrix = load_store(store_dir, pooling)
+        print(f"{pooling}: {matrix.shape} for {len(metadata)} clauses")
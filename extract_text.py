@@ -8,9 +8,14 @@ def extract_text_from_pdf(pdf_path):
         text += page.get_text()
     return text
 
+def extract_pages_from_pdf(pdf_path=None, stream=None):
+    """Extract the text of each page from a PDF file or an in-memory PDF."""
+    doc = fitz.open(pdf_path) if stream is None else fitz.open(stream=stream, filetype="pdf")
+    with doc:
+        return [page.get_text() for page in doc]
+
 # Test the function
 if __name__ == "__main__":
     pdf_path = "example_contract.pdf"  # Replace with your PDF file path
     pdf_text = extract_text_from_pdf(pdf_path)
     print(pdf_text[:500])  # Print the first 500 characters
-
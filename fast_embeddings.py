@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from autotune import sample_clauses
+from clause_classifier import build_prototypes, classify_embeddings, normalize_rows
+from embedding_cache import EmbeddingCache
+from embedding_compression import top_k
+from playbook import Playbook, collect_playbook_templates
+from process_tokens import embed_texts
+
+class EmbeddingMode:
+    """An encoder depth and max_length, with the clause-type prototypes and tone templates embedded the same way."""
+
+    def __init__(self, depth=None, max_length=512):
+        self.depth = depth
+        self.max_length = max_length
+        self.cache = EmbeddingCache(depth=depth, max_length=max_length)
+        self.clause_types, self.prototypes = build_prototypes(self.cache)
+        templates = collect_playbook_templates()
+        self.playbook = Playbook(templates, self.cache.embed(templates["Template"].tolist()))
+
+    def embed(self, texts, batch_size=64):
+        """Embed texts at this mode's depth and max_length."""
+        return embed_texts(texts, batch_size=batch_size, max_length=self.max_length, depth=self.depth)
+
+    def classify(self, embeddings):
+        """Return clause-type labels, confidence and the margin to the runner-up type."""
+        labels, confidence = classify_embeddings(embeddings, self.clause_types, self.prototypes)
+        scores = np.sort(normalize_rows(embeddings) @ self.prototypes.T, axis=1)
+        margin = scores[:, -1] - scores[:, -2] if scores.shape[1] > 1 else scores[:, -1]
+        return labels, confidence, margin
+
+    def tones(self, embeddings):
+        """Tone of the nearest approved template, regardless of clause type."""
+        similarity = normalize_rows(embeddings) @ self.playbook.vectors.T
+        return self.playbook.templates["Tone"].to_numpy()[similarity.argmax(axis=1)]
+
+def nearest_neighbours(vectors, k):
+    """Indices of each row's k most similar other rows, excluding the row itself."""
+    vectors = normalize_rows(vectors)
+    scores = vectors @ vectors.T
+    # Every clause is its own best match in any space, which would inflate the overlap
+    np.fill_diagonal(scores, -np.inf)
+    return top_k(scores, k)
+
+def quality_report(texts, depths=(2, 4, 6, 8), max_lengths=(128, 512), k=10):
+    """Compare truncated-depth embeddings with the full model on clause type, tone and neighbour overlap."""
+    full = EmbeddingMode()
+    full_vectors = full.embed(texts)
+    full_labels, _, _ = full.classify(full_vectors)
+    full_tones = full.tones(full_vectors)
+    full_neighbours = nearest_neighbours(full_vectors, k)
+
+    rows = []
+    for depth in depths:
+        for max_length in max_lengths:
+            mode = EmbeddingMode(depth, max_length)
+            vectors = mode.embed(texts)
+            labels, _, _ = mode.classify(vectors)
+            neighbours = nearest_neighbours(vectors, k)
+            overlap = np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(neighbours, full_neighbours)])
+            rows.append({
+                "Depth": depth,
+                "Max Length": max_length,
+                "Clause Type Agreement": float(np.mean(labels == full_labels)),
+                "Tone Agreement": float(np.mean(mode.tones(vectors) == full_tones)),
+                f"Neighbour Overlap@{k}": float(overlap),
+            })
+    return pd.DataFrame(rows)
+
+def embed_with_refinement(texts, depth=6, max_length=128, min_margin=0.02, batch_size=64):
+    """Embed with a truncated model, then re-embed clauses with an uncertain clause type at full depth."""
+    fast = EmbeddingMode(depth, max_length)
+    vectors = fast.embed(texts, batch_size)
+    labels, confidence, margin = fast.classify(vectors)
+
+    uncertain = (margin < min_margin) | pd.isna(labels)
+    if uncertain.any():
+        print(f"Re-embedding {int(uncertain.sum())} of {len(texts)} uncertain clauses at full depth...")
+        full = EmbeddingMode()
+        index = np.flatnonzero(uncertain)
+        full_vectors = full.embed([texts[i] for i in index], batch_size)
+        full_labels, full_confidence, _ = full.classify(full_vectors)
+        labels[index], confidence[index] = full_labels, full_confidence
+        # Refined rows carry full-depth vectors; the returned mask says which ones
+        vectors = vectors.copy()
+        vectors[index] = full_vectors
+    return vectors, labels, confidence, uncertain
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report how truncated LEGAL-BERT depths compare with the full model.")
+    parser.add_argument("--input-csv", default="outputs/results/contract_analysis_results.csv", help="Clauses to sample.")
+    parser.add_argument("--sample-size", type=int, default=500, help="Number of clauses to compare on.")
+    parser.add_argument("--depths", type=int, nargs="+", default=[2, 4, 6, 8], help="Encoder depths to try.")
+    parser.add_argument("--max-lengths", type=int, nargs="+", default=[128, 512], help="Token limits to try.")
+    args = parser.parse_args()
+
+    texts = sample_clauses(args.input_csv, args.sample_size)
+    print(quality_report(texts, args.depths, args.max_lengths).to_string(index=False))
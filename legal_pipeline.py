@@ -1,6 +1,6 @@
 import os
 import pandas as pd
-from extract_text import extract_text_from_pdf
+from text_cache import get_text_cache
 from extract_clauses import extract_clauses
 from process_tokens import process_text
 
@@ -13,7 +13,7 @@ def analyze_pdf(pdf_path):
         print(f"Error: The file '{pdf_path}' does not exist.")
         return
     
-    text = extract_text_from_pdf(pdf_path)
+    text = get_text_cache().get_text(pdf_path)
     if not text.strip():
         print(f"Error: No text extracted from '{pdf_path}'.")
         return
@@ -0,0 +1,145 @@
+import os
+import hashlib
+import importlib.util
+import numpy as np
+import pandas as pd
+from generate_random_contracts2 import clauses as standard_templates
+from analytics import clause_contexts
+from clause_classifier import example_values, normalize_rows
+from embedding_cache import EmbeddingCache
+from process_tokens import embed_texts
+
+# Tone-variant templates live in the archived generator
+archived_generator_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive-deprecated-scripts", "generate_random_contracts.py")
+
+# Map the keywords used by analyze_contracts to template clause types
+keyword_clause_types = {
+    "confidentiality": "confidentiality",
+    "liability cap": "liability_cap",
+    "archiving": "archive_duration",
+    "data retention": "archive_duration",
+    "governing law": "dispute_resolution",
+    "payment terms": "payment_terms",
+}
+
+# Extra risk for clauses whose closest approved wording favours the supplier
+tone_penalty = {"neutral": 0.0, "customer-friendly": 0.0, "supplier-friendly": 0.15}
+
+def load_archived_templates(path=archived_generator_path):
+    """Load the tone-variant clause templates from the archived generator."""
+    spec = importlib.util.spec_from_file_location("archived_generate_random_contracts", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.clauses
+
+def collect_playbook_templates(include_archived=True):
+    """Return approved templates as a DataFrame with clause type, tone and filled-in text."""
+    sources = [("standard", standard_templates)]
+    if include_archived and os.path.isfile(archived_generator_path):
+        sources.append(("archived", load_archived_templates()))
+
+    rows = []
+    for source, templates in sources:
+        for clause_type, variants in templates.items():
+            # Plain lists are untoned; dicts map tone -> templates
+            toned = variants.items() if isinstance(variants, dict) else [("neutral", variants)]
+            for tone, texts in toned:
+                for text in texts:
+                    rows.append({"Clause Type": clause_type, "Tone": tone, "Source": source,
+                                 "Template": text.format(**example_values)})
+    return pd.DataFrame(rows).drop_duplicates("Template").reset_index(drop=True)
+
+class Playbook:
+    """Approved clause templates embedded once and kept as a persistent unit-norm matrix."""
+
+    def __init__(self, templates, vectors):
+        self.templates = templates
+        self.vectors = normalize_rows(vectors.astype(np.float32))
+        self.clause_types = templates["Clause Type"].to_numpy()
+
+    @classmethod
+    def load(cls, path="outputs/playbook/templates.npz", include_archived=True):
+        """Load the template matrix from disk, re-embedding only if the templates changed."""
+        templates = collect_playbook_templates(include_archived)
+        fingerprint = hashlib.sha1("\n".join(templates["Template"]).encode("utf-8")).hexdigest()
+
+        if os.path.isfile(path):
+            data = np.load(path, allow_pickle=False)
+            if str(data["fingerprint"]) == fingerprint:
+                return cls(templates, data["vectors"])
+
+        print(f"Embedding {len(templates)} playbook templates...")
+        vectors = embed_texts(templates["Template"].tolist())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, fingerprint=np.array(fingerprint), vectors=vectors)
+        return cls(templates, vectors)
+
+    def score(self, embeddings, clause_types, batch_size=4096):
+        """Return the closest same-type template index and its similarity for each clause embedding."""
+        clause_types = np.asarray(clause_types, dtype=object)
+        best_index = np.full(len(embeddings), -1, dtype=np.int64)
+        best_similarity = np.full(len(embeddings), np.nan, dtype=np.float32)
+
+        for start in range(0, len(embeddings), batch_size):
+            stop = start + batch_size
+            similarity = normalize_rows(np.asarray(embeddings[start:stop], dtype=np.float32)) @ self.vectors.T
+            # Only templates of the clause's own type count as approved wording
+            same_type = clause_types[start:stop, None] == self.clause_types[None, :]
+            similarity = np.where(same_type, similarity, -np.inf)
+            index = similarity.argmax(axis=1)
+            values = similarity[np.arange(len(index)), index]
+            has_template = np.isfinite(values)
+            best_index[start:stop] = np.where(has_template, index, -1)
+            best_similarity[start:stop] = np.where(has_template, values, np.nan)
+        return best_index, best_similarity
+
+def deviation_report(input_csv, output_csv, summary_csv=None, cache_path="outputs/cache/sentence_embeddings.npz", flag_threshold=0.1):
+    """Score extracted clauses against the playbook and write a per-contract deviation report sorted by risk."""
+    print(f"Loading clauses from: {input_csv}")
+    data = pd.read_csv(input_csv)
+    # Keyword results name clauses by keyword, classifier results already use template types
+    data["Clause Type"] = data["Clause"].map(lambda clause: keyword_clause_types.get(clause, clause))
+
+    playbook = Playbook.load()
+    # Keyword rows hold only the section heading, so score the section text that follows it;
+    # classifier rows have no page positions and are already whole sentences
+    sections, _ = clause_contexts(data)
+    data["Section Text"] = sections.where(sections.str.len() > 0, data["Content"].astype(str))
+    cache = EmbeddingCache(cache_path)
+    embeddings = cache.embed(data["Section Text"].tolist())
+    cache.save()
+
+    index, similarity = playbook.score(embeddings, data["Clause Type"].to_numpy())
+    matched = index >= 0
+    nearest = playbook.templates.iloc[np.where(matched, index, 0)].reset_index(drop=True)
+    data["Nearest Template"] = np.where(matched, nearest["Template"], None)
+    data["Template Tone"] = np.where(matched, nearest["Tone"], None)
+    data["Similarity"] = similarity
+    data["Deviation"] = 1.0 - similarity
+    data["Risk"] = data["Deviation"] + data["Template Tone"].map(tone_penalty).fillna(0.0)
+    data["Flagged"] = data["Risk"] >= flag_threshold
+
+    contract_column = "File" if "File" in data.columns else "Company"
+    report = data[matched].sort_values([contract_column, "Risk"], ascending=[True, False])
+    report.to_csv(output_csv, index=False)
+    print(f"Deviation report saved to {output_csv} ({int(report['Flagged'].sum())} clauses flagged)")
+
+    if summary_csv:
+        summary = (report.groupby(contract_column)
+                   .agg(Clauses=("Risk", "size"), Flagged=("Flagged", "sum"), **{"Max Risk": ("Risk", "max"), "Mean Deviation": ("Deviation", "mean")})
+                   .sort_values("Max Risk", ascending=False))
+        summary.to_csv(summary_csv)
+        print(f"Per-contract summary saved to {summary_csv}")
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score clauses against the approved clause playbook.")
+    parser.add_argument("--input-csv", default="outputs/results/contract_analysis_results.csv", help="Extracted clauses to score.")
+    parser.add_argument("--output-csv", default="outputs/results/playbook_deviations.csv", help="Where to write the clause-level report.")
+    parser.add_argument("--summary-csv", default="outputs/results/playbook_summary.csv", help="Where to write the per-contract summary.")
+    parser.add_argument("--flag-threshold", type=float, default=0.1, help="Risk at or above which a clause is flagged.")
+    args = parser.parse_args()
+
+    deviation_report(args.input_csv, args.output_csv, args.summary_csv, flag_threshold=args.flag_threshold)
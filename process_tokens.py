@@ -1,9 +1,17 @@
+import copy
+import time
+import numpy as np
 import torch
 from transformers import AutoTokenizer, AutoModel
+from token_cache import default_token_cache_dir, get_token_cache
+
+# Pooled views that embed_texts_pooled can produce from a single forward pass
+pooling_strategies = ["mean", "cls", "max", "last_layers"]
 
 # Global variables initialized as None
 _tokenizer = None
 _model = None
+_truncated_models = {}
 
 def get_model():
     """Load and return the tokenizer and model as singletons."""
@@ -11,8 +19,29 @@ def get_model():
     if _tokenizer is None or _model is None:
         _tokenizer = AutoTokenizer.from_pretrained("nlpaueb/legal-bert-base-uncased")
         _model = AutoModel.from_pretrained("nlpaueb/legal-bert-base-uncased")
+        _model.eval()
     return _tokenizer, _model
 
+def get_truncated_model(depth=None):
+    """Return the tokenizer and a view of the model that runs only its first `depth` encoder layers."""
+    tokenizer, model = get_model()
+    if depth is None or depth >= model.config.num_hidden_layers:
+        return tokenizer, model
+    if depth not in _truncated_models:
+        # Shallow copies share weights with the full singleton, so extra depths cost no memory
+        truncated = copy.copy(model)
+        truncated._modules = dict(model._modules)
+        encoder = copy.copy(model.encoder)
+        encoder._modules = dict(model.encoder._modules)
+        encoder.layer = torch.nn.ModuleList(model.encoder.layer[:depth])
+        config = copy.deepcopy(model.config)
+        config.num_hidden_layers = depth
+        encoder.config = config
+        truncated.config = config
+        truncated.encoder = encoder
+        _truncated_models[depth] = truncated
+    return tokenizer, _truncated_models[depth]
+
 def process_text(text):
     """Tokenize text and get embeddings from LEGAL-BERT."""
     tokenizer, model = get_model()
@@ -21,9 +50,90 @@ def process_text(text):
         outputs = model(**tokens)
     return outputs.last_hidden_state
 
+def mean_pool(last_hidden_state, attention_mask):
+    """Average token embeddings, ignoring padding positions."""
+    mask = attention_mask.unsqueeze(-1).to(last_hidden_state.dtype)
+    summed = (last_hidden_state * mask).sum(dim=1)
+    counts = mask.sum(dim=1).clamp(min=1.0)
+    return summed / counts
+
+def pad_batch(sequences, pad_token_id):
+    """Pad pre-tokenized id sequences into input_ids and attention_mask tensors."""
+    input_ids = torch.full((len(sequences), max(len(ids) for ids in sequences)), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros_like(input_ids)
+    for i, ids in enumerate(sequences):
+        input_ids[i, :len(ids)] = torch.from_numpy(ids.astype(np.int64))
+        attention_mask[i, :len(ids)] = 1
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+def pool_outputs(outputs, attention_mask, poolings=("mean",), num_layers=4, layer_weights=None):
+    """Compute several pooled views of one forward pass, keyed by pooling name."""
+    pooled = {}
+    mask = attention_mask.unsqueeze(-1).bool()
+    for pooling in poolings:
+        if pooling == "mean":
+            pooled[pooling] = mean_pool(outputs.last_hidden_state, attention_mask)
+        elif pooling == "cls":
+            pooled[pooling] = outputs.last_hidden_state[:, 0]
+        elif pooling == "max":
+            masked = outputs.last_hidden_state.masked_fill(~mask, torch.finfo(outputs.last_hidden_state.dtype).min)
+            pooled[pooling] = masked.max(dim=1).values
+        elif pooling == "last_layers":
+            # Weighted mix of the last N encoder layers, then mask-aware mean
+            weights = torch.ones(num_layers) if layer_weights is None else torch.tensor(layer_weights, dtype=torch.float32)
+            layers = torch.stack(outputs.hidden_states[-len(weights):])
+            weights = (weights / weights.sum()).to(layers.dtype).view(-1, 1, 1, 1)
+            pooled[pooling] = mean_pool((layers * weights).sum(dim=0), attention_mask)
+        else:
+            raise ValueError(f"Unknown pooling strategy: {pooling}. Choose from {pooling_strategies}.")
+    return pooled
+
+def embed_texts_pooled(texts, poolings=("mean",), batch_size=32, max_length=512, num_layers=4, layer_weights=None,
+                       batch_sizer=None, depth=None, token_cache_dir=default_token_cache_dir):
+    """Embed texts in batches and return a dict of (n, hidden_size) float32 arrays, one per pooling."""
+    # depth runs only the first encoder layers for a cheaper first pass
+    tokenizer, model = get_truncated_model(depth)
+    need_hidden_states = "last_layers" in poolings
+    # Token ids come from the cache; only texts never seen before are tokenized. A token_cache_dir of None
+    # tokenizes without persisting, for one-off texts such as server requests and search queries
+    sequences = get_token_cache(tokenizer, max_length, token_cache_dir).encode(list(texts))
+    # Longest first, so each batch holds similar lengths and little padding
+    order = sorted(range(len(sequences)), key=lambda i: len(sequences[i]), reverse=True)
+    vectors = {pooling: [] for pooling in poolings}
+    start = 0
+    while start < len(order):
+        # An autotune.AdaptiveBatchSizer picks each batch size from measured latency
+        size = batch_sizer.batch_size if batch_sizer else batch_size
+        batch = order[start:start + size]
+        started = time.perf_counter()
+        tokens = pad_batch([sequences[i] for i in batch], tokenizer.pad_token_id)
+        with torch.no_grad():
+            outputs = model(**tokens, output_hidden_states=need_hidden_states)
+        pooled = pool_outputs(outputs, tokens["attention_mask"], poolings, num_layers, layer_weights)
+        for pooling, batch_vectors in pooled.items():
+            vectors[pooling].append(batch_vectors)
+        if batch_sizer:
+            batch_sizer.record(len(batch), time.perf_counter() - started)
+        start += len(batch)
+
+    hidden_size = model.config.hidden_size
+    embeddings = {}
+    for pooling, chunks in vectors.items():
+        if not chunks:
+            embeddings[pooling] = np.empty((0, hidden_size), dtype=np.float32)
+            continue
+        # Put rows back in input order
+        embeddings[pooling] = np.empty((len(order), hidden_size), dtype=np.float32)
+        embeddings[pooling][order] = torch.cat(chunks).float().numpy()
+    return embeddings
+
+def embed_texts(texts, batch_size=32, max_length=512, depth=None, token_cache_dir=default_token_cache_dir):
+    """Embed a list of texts in batches and return a (n, hidden_size) float32 array."""
+    return embed_texts_pooled(texts, ("mean",), batch_size=batch_size, max_length=max_length, depth=depth,
+                              token_cache_dir=token_cache_dir)["mean"]
+
 # Test processing
 if __name__ == "__main__":
     text = "This agreement is subject to the governing law of California."
     embeddings = process_text(text)
     print(f"Embeddings shape: {embeddings.shape}")  # Output: [batch_size, sequence_length, hidden_size]
-
@@ -0,0 +1,153 @@
+import os
+import numpy as np
+
+class ScoreHistogram:
+    """Fixed-resolution per-label score histograms that give approximate ROC and PR curves."""
+
+    def __init__(self, bins=2048, low=-1.0, high=1.0, positives=None, negatives=None):
+        self.bins = bins
+        self.low = low
+        self.high = high
+        self.positives = np.zeros(bins, dtype=np.int64) if positives is None else np.asarray(positives, dtype=np.int64)
+        self.negatives = np.zeros(bins, dtype=np.int64) if negatives is None else np.asarray(negatives, dtype=np.int64)
+
+    def bin_index(self, scores):
+        """Map scores to bin indices; scores outside [low, high] go to the edge bins."""
+        scores = np.asarray(scores, dtype=np.float64)
+        index = np.floor((scores - self.low) / (self.high - self.low) * self.bins).astype(np.int64)
+        return np.clip(index, 0, self.bins - 1)
+
+    def add(self, scores, labels):
+        """Count a batch of scores with boolean (or 0/1) labels."""
+        index = self.bin_index(scores)
+        labels = np.asarray(labels).astype(bool)
+        self.positives += np.bincount(index[labels], minlength=self.bins)
+        self.negatives += np.bincount(index[~labels], minlength=self.bins)
+        return self
+
+    def merge(self, other):
+        """Add another histogram's counts, e.g. a partial result from another worker."""
+        if (self.bins, self.low, self.high) != (other.bins, other.low, other.high):
+            raise ValueError("Cannot merge histograms with different bins or ranges.")
+        self.positives += other.positives
+        self.negatives += other.negatives
+        return self
+
+    def save(self, path):
+        """Write the counts to an .npz file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, bins=self.bins, low=self.low, high=self.high, positives=self.positives, negatives=self.negatives)
+
+    @classmethod
+    def load(cls, path):
+        """Read counts written by save()."""
+        data = np.load(path)
+        return cls(int(data["bins"]), float(data["low"]), float(data["high"]), data["positives"], data["negatives"])
+
+    def thresholds(self):
+        """Lower bin edges from the highest bin down, matching the cumulative counts."""
+        return (self.low + np.arange(self.bins) * (self.high - self.low) / self.bins)[::-1]
+
+    def cumulative_counts(self):
+        """True and false positives when thresholding at each bin's lower edge, highest first."""
+        return np.cumsum(self.positives[::-1]), np.cumsum(self.negatives[::-1])
+
+    def roc_curve(self):
+        """Return (fpr, tpr, thresholds), exact at every bin edge."""
+        tp, fp = self.cumulative_counts()
+        fpr = np.concatenate([[0.0], fp / max(fp[-1], 1)])
+        tpr = np.concatenate([[0.0], tp / max(tp[-1], 1)])
+        return fpr, tpr, np.concatenate([[self.high], self.thresholds()])
+
+    def auc(self):
+        """Trapezoidal AUC, which scores pairs sharing a bin as ties."""
+        fpr, tpr, _ = self.roc_curve()
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def auc_error_bound(self):
+        """Largest possible difference from the exact AUC: half the share of positive-negative pairs in the same bin."""
+        pairs = self.positives.sum() * self.negatives.sum()
+        return float(np.dot(self.positives, self.negatives) / (2 * pairs)) if pairs else 0.0
+
+    def precision_recall_curve(self):
+        """Return (precision, recall, thresholds) at the bin edges that have any scores above them."""
+        tp, fp = self.cumulative_counts()
+        predicted = tp + fp
+        keep = predicted > 0
+        precision = tp[keep] / predicted[keep]
+        recall = tp[keep] / max(tp[-1], 1)
+        return precision, recall, self.thresholds()[keep]
+
+    def average_precision(self):
+        """Step-wise area under the PR curve, as sklearn's average_precision_score computes it."""
+        precision, recall, _ = self.precision_recall_curve()
+        return float(np.sum(np.diff(np.concatenate([[0.0], recall])) * precision))
+
+def row_norms(matrix, block_size=65536):
+    """Row lengths of a possibly memory-mapped matrix, read in blocks."""
+    norms = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), block_size):
+        block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+        norms[start:start + block_size] = np.linalg.norm(block, axis=1)
+    return np.maximum(norms, 1e-12)
+
+def pair_histogram(matrix, positive_mask, rows=None, histogram=None, block_size=2048):
+    """Stream cosine scores of positive rows against all other rows; same-set pairs are the positives."""
+    if histogram is None:
+        histogram = ScoreHistogram()
+    positive_mask = np.asarray(positive_mask, dtype=bool)
+    norms = row_norms(matrix)
+    queries = np.flatnonzero(positive_mask)
+    if rows is not None:
+        # Workers split the query rows and merge their histograms afterwards
+        queries = queries[(queries >= rows[0]) & (queries < rows[1])]
+
+    for q_start in range(0, len(queries), block_size):
+        q_index = queries[q_start:q_start + block_size]
+        q_block = np.asarray(matrix[q_index], dtype=np.float32) / norms[q_index, None]
+        for c_start in range(0, len(matrix), block_size):
+            c_block = np.asarray(matrix[c_start:c_start + block_size], dtype=np.float32)
+            c_index = np.arange(c_start, c_start + len(c_block))
+            scores = q_block @ (c_block / norms[c_index, None]).T
+            # A clause compared with itself says nothing about the embedding
+            keep = q_index[:, None] != c_index[None, :]
+            labels = np.broadcast_to(positive_mask[c_index][None, :], scores.shape)
+            histogram.add(scores[keep], labels[keep])
+    return histogram
+
+if __name__ == "__main__":
+    import argparse
+    from embedding_store import load_store
+    from visualize_embeddings2 import plot_precision_recall, plot_roc_auc
+
+    parser = argparse.ArgumentParser(description="Histogram-based ROC/PR evaluation of tone separation over all clause pairs.")
+    parser.add_argument("--store-dir", default="outputs/embeddings", help="Embedding store to evaluate.")
+    parser.add_argument("--pooling", default="mean", help="Pooling strategy to evaluate.")
+    parser.add_argument("--tone", default="supplier-friendly", help="Tone whose clauses are the positives.")
+    parser.add_argument("--rows", type=int, nargs=2, metavar=("START", "END"), help="Only use query rows in this range (one worker's share).")
+    parser.add_argument("--bins", type=int, default=2048, help="Histogram resolution over [-1, 1].")
+    parser.add_argument("--save", help="Write the histogram to this .npz instead of plotting.")
+    parser.add_argument("--merge", nargs="+", help="Merge partial histograms from workers and plot them.")
+    parser.add_argument("--output-dir", default="outputs/visualizations", help="Where to write the plots.")
+    args = parser.parse_args()
+
+    if args.merge:
+        histogram = ScoreHistogram.load(args.merge[0])
+        for path in args.merge[1:]:
+            histogram.merge(ScoreHistogram.load(path))
+    else:
+        metadata, matrix = load_store(args.store_dir, args.pooling)
+        if "Tone" not in metadata.columns:
+            from validate_embeddings import label_tone
+            metadata["Tone"] = metadata["Content"].astype(str).map(label_tone)
+        print(f"Scoring {args.tone} clause pairs in {args.store_dir}...")
+        histogram = pair_histogram(matrix, (metadata["Tone"] == args.tone).to_numpy(), args.rows, ScoreHistogram(args.bins))
+
+    if args.save:
+        histogram.save(args.save)
+        print(f"Histogram saved to {args.save}")
+    else:
+        print(f"AUC {histogram.auc():.4f} (within ±{histogram.auc_error_bound():.4f}), average precision {histogram.average_precision():.4f}")
+        os.makedirs(args.output_dir, exist_ok=True)
+        plot_roc_auc(histogram, args.tone, os.path.join(args.output_dir, f"roc_auc_{args.tone}.png"))
+        plot_precision_recall(histogram, args.tone, os.path.join(args.output_dir, f"precision_recall_{args.tone}.png"))
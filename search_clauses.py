@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+from embedding_cache import EmbeddingCache
+from embedding_compression import ProductQuantizer, normalize_rows
+from embedding_store import load_store
+from process_tokens import pooling_strategies
+
+class ClauseSearcher:
+    """Natural-language search over stored clause vectors, with metadata filters."""
+
+    def __init__(self, store_dir="outputs/embeddings", pooling="mean", compression=None,
+                 query_cache_path=None):
+        self.metadata, self.matrix = load_store(store_dir, pooling)
+        self.quantizer, self.codes = None, None
+        if compression == "pq":
+            # Product-quantized codes are scored with lookup tables instead of full vectors
+            data = np.load(os.path.join(store_dir, f"{pooling}.pq.npz"))
+            self.quantizer, self.codes = ProductQuantizer(data["codebooks"]), data["codes"]
+        elif compression == "float16":
+            self.matrix = np.load(os.path.join(store_dir, f"{pooling}.float16.npy"), mmap_mode="r")
+        # Norms are taken once here so queries only need a dot product per row; float16 copies are already unit length
+        self.inverse_norms = None if compression else self.row_inverse_norms()
+        # Queries are embedded with the same pooling as the stored vectors, and cached per pooling; their
+        # vectors are cached already, so their token ids don't go into the token cache
+        self.query_cache = EmbeddingCache(query_cache_path or f"outputs/cache/query_embeddings.{pooling}.npz", pooling=pooling,
+                                          token_cache_dir=None)
+        if "Tone" not in self.metadata.columns:
+            # Keyword-analysis stores have no tone yet; label it once so it can be filtered on
+            from validate_embeddings import label_tone
+            self.metadata["Tone"] = self.metadata["Content"].astype(str).map(label_tone)
+
+    def row_inverse_norms(self, chunk_size=100000):
+        """Return 1 / norm of every stored vector, read in chunks from the memmap."""
+        inverse = np.empty(len(self.matrix), dtype=np.float32)
+        for start in range(0, len(self.matrix), chunk_size):
+            chunk = np.asarray(self.matrix[start:start + chunk_size], dtype=np.float32)
+            inverse[start:start + chunk_size] = 1.0 / np.maximum(np.linalg.norm(chunk, axis=1), 1e-12)
+        return inverse
+
+    def filter_rows(self, company=None, contract_type=None, tone=None, clause=None):
+        """Return the row indices matching all given filters."""
+        mask = np.ones(len(self.metadata), dtype=bool)
+        for column, value in (("Company", company), ("Contract Type", contract_type), ("Tone", tone), ("Clause", clause)):
+            if value:
+                mask &= (self.metadata[column].astype(str).str.lower() == value.lower()).to_numpy()
+        return np.flatnonzero(mask)
+
+    def score(self, query_vector, rows, chunk_size=100000):
+        """Cosine similarity between the query and the given rows, computed in chunks."""
+        if self.quantizer is not None:
+            # Stored vectors were normalized before quantization
+            return self.quantizer.adc_scores(query_vector, self.codes[rows])
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), chunk_size):
+            chunk_rows = rows[start:start + chunk_size]
+            chunk_scores = np.asarray(self.matrix[chunk_rows], dtype=np.float32) @ query_vector
+            if self.inverse_norms is not None:
+                chunk_scores *= self.inverse_norms[chunk_rows]
+            scores[start:start + chunk_size] = chunk_scores
+        return scores
+
+    def search(self, query, top_k=10, **filters):
+        """Return the top_k clauses closest to a natural-language query."""
+        cached = len(self.query_cache)
+        query_vector = normalize_rows(self.query_cache.embed([query]))[0]
+        if len(self.query_cache) > cached:
+            # Only a new query changes the cache; repeated ones skip rewriting it
+            self.query_cache.save()
+        rows = self.filter_rows(**filters)
+        if len(rows) == 0:
+            return pd.DataFrame()
+
+        scores = self.score(query_vector, rows)
+        k = min(top_k, len(rows))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+
+        columns = [c for c in ("Company", "Contract Type", "Clause", "Tone", "File", "Page", "Offset", "Content") if c in self.metadata.columns]
+        hits = self.metadata.iloc[rows[best]][columns].copy()
+        hits.insert(0, "Score", scores[best])
+        return hits.reset_index(drop=True)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search clauses across all contracts with a natural-language query.")
+    parser.add_argument("query", nargs="?", help="Query text; omit to start an interactive prompt.")
+    parser.add_argument("--store-dir", default="outputs/embeddings", help="Embedding store to search.")
+    parser.add_argument("--pooling", choices=pooling_strategies, default="mean", help="Stored pooling to search.")
+    parser.add_argument("--compression", choices=["float16", "pq"], help="Search a compressed copy of the vectors.")
+    parser.add_argument("--top-k", type=int, default=10, help="Number of hits to return.")
+    parser.add_argument("--company", help="Only search this company's contracts.")
+    parser.add_argument("--contract-type", help="Only search this contract type (e.g. MSA).")
+    parser.add_argument("--tone", help="Only search clauses with this tone.")
+    args = parser.parse_args()
+
+    searcher = ClauseSearcher(args.store_dir, args.pooling, compression=args.compression)
+    filters = {"company": args.company, "contract_type": args.contract_type, "tone": args.tone}
+    pd.set_option("display.max_colwidth", 80)
+
+    if args.query:
+        print(searcher.search(args.query, args.top_k, **filters).to_string(index=False))
+    else:
+        # Keep the model and vectors loaded between queries
+        while True:
+            try:
+                query = input("search> ").strip()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if query:
+                print(searcher.search(query, args.top_k, **filters).to_string(index=False))
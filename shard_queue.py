@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import shutil
+import socket
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from analyze_contracts import iter_contract_pdfs, extract_contract_clauses, embed_clause_rows
+from embedding_store import save_store, load_store, list_poolings
+from process_tokens import pooling_strategies
+from autotune import AdaptiveBatchSizer, load_host_config, apply_config
+from archive_input import is_archive, iter_archive_pdfs
+
+def connect(db_path):
+    """Open the work queue database; it can live on a directory shared by all nodes."""
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 60000")
+    # Queues created before shard outputs were versioned have no output column
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(shards)")]
+    if columns and "output" not in columns:
+        conn.execute("ALTER TABLE shards ADD COLUMN output TEXT")
+    return conn
+
+def create_queue(db_path, base_folder, shard_size=50):
+    """Split the PDF manifest of a folder or archive into shards and place them in the work queue."""
+    # Archive members stay in archive order, so workers read tar members with forward seeks only
+    manifest = list(iter_archive_pdfs(base_folder)) if is_archive(base_folder) else sorted(iter_contract_pdfs(base_folder))
+    conn = connect(db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS shards (
+            id INTEGER PRIMARY KEY,
+            files TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            owner TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            output TEXT
+        )
+    """)
+    if conn.execute("SELECT COUNT(*) FROM shards").fetchone()[0]:
+        raise ValueError(f"Work queue {db_path} already contains shards.")
+
+    shards = [manifest[i:i + shard_size] for i in range(0, len(manifest), shard_size)]
+    conn.executemany("INSERT INTO shards (id, files) VALUES (?, ?)",
+                     [(shard_id, json.dumps(files)) for shard_id, files in enumerate(shards)])
+    conn.close()
+    print(f"Queued {len(manifest)} contracts in {len(shards)} shards at {db_path}")
+
+def claim_shard(conn, worker_id, lease_seconds=600, max_attempts=3):
+    """Lease the next pending or expired shard, or return None when nothing is claimable."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # A worker that crashed (OOM, segfault on a bad PDF) never reaches fail_shard, so its attempts are counted here
+        conn.execute("""
+            UPDATE shards SET status = 'failed', owner = NULL, lease_expires = NULL,
+                              error = 'Lease expired without the worker finishing or failing the shard'
+            WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+        """, (now, max_attempts))
+        row = conn.execute("""
+            SELECT id, files FROM shards
+            WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+            ORDER BY id LIMIT 1
+        """, (now,)).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute("UPDATE shards SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                     (worker_id, now + lease_seconds, row[0]))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row[0], [tuple(entry) for entry in json.loads(row[1])]
+
+def renew_lease(conn, shard_id, worker_id, lease_seconds=600):
+    """Extend a lease; returns False if another worker has taken the shard over."""
+    cursor = conn.execute("UPDATE shards SET lease_expires = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+                          (time.time() + lease_seconds, shard_id, worker_id))
+    return cursor.rowcount == 1
+
+def complete_shard(conn, shard_id, worker_id, output):
+    """Mark a shard done and record its output directory; returns False if the lease was lost."""
+    cursor = conn.execute("""
+        UPDATE shards SET status = 'done', lease_expires = NULL, error = NULL, output = ?
+        WHERE id = ? AND owner = ? AND status = 'leased'
+    """, (output, shard_id, worker_id))
+    return cursor.rowcount == 1
+
+class LeaseHeartbeat:
+    """Renew a shard lease from a background thread while the shard is being processed."""
+
+    def __init__(self, db_path, shard_id, worker_id, lease_seconds=600):
+        self.db_path = db_path
+        self.shard_id = shard_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        # SQLite connections can't be shared across threads, so the heartbeat has its own
+        conn = connect(self.db_path)
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                if not renew_lease(conn, self.shard_id, self.worker_id, self.lease_seconds):
+                    self.lost = True
+                    break
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+def fail_shard(conn, shard_id, worker_id, error, max_attempts=3):
+    """Return a shard to the queue, or mark it failed once it has used up its attempts."""
+    conn.execute("""
+        UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                          owner = NULL, lease_expires = NULL, error = ?
+        WHERE id = ? AND owner = ?
+    """, (max_attempts, error, shard_id, worker_id))
+
+def shard_dir(output_dir, shard_id):
+    return os.path.join(output_dir, f"shard_{shard_id:05d}")
+
+def process_shard(conn, shard_id, files, worker_id, output_dir, lease_seconds=600, poolings=pooling_strategies, batch_sizer=None,
+                  db_path=None):
+    """Analyze one shard into a new versioned directory and publish it only if the lease is still held."""
+    db_path = db_path or conn.execute("PRAGMA database_list").fetchone()[2]
+    with LeaseHeartbeat(db_path, shard_id, worker_id, lease_seconds) as heartbeat:
+        results = []
+        for file_path, company_name, contract_type in files:
+            print(f"[{worker_id}] Analyzing: {file_path}")
+            results.extend(extract_contract_clauses(file_path, company_name, contract_type))
+            if heartbeat.lost:
+                raise RuntimeError(f"Lost the lease on shard {shard_id}")
+
+        df, embeddings = embed_clause_rows(results, poolings, batch_sizer)
+        if heartbeat.lost or not renew_lease(conn, shard_id, worker_id, lease_seconds):
+            raise RuntimeError(f"Lost the lease on shard {shard_id}")
+
+    # Every attempt writes its own directory, so a previous output is never removed before the new one exists
+    version_dir = f"{shard_dir(output_dir, shard_id)}.{worker_id}.{time.time_ns()}"
+    tmp_dir = f"{version_dir}.tmp"
+    save_store(tmp_dir, df, embeddings)
+    os.replace(tmp_dir, version_dir)
+
+    # The queue row is the pointer: the shard counts as done only once it names this directory
+    if not complete_shard(conn, shard_id, worker_id, os.path.basename(version_dir)):
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise RuntimeError(f"Lost the lease on shard {shard_id}; discarded its output")
+
+def run_worker(db_path, output_dir, worker_id=None, lease_seconds=600, max_attempts=3, poll_seconds=0):
+    """Claim and process shards until the queue is drained."""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    os.makedirs(output_dir, exist_ok=True)
+    # Each node uses its own autotuned settings
+    config = load_host_config()
+    apply_config(config)
+    batch_sizer = AdaptiveBatchSizer(batch_size=config["batch_size"])
+    conn = connect(db_path)
+    processed = 0
+    while True:
+        claimed = claim_shard(conn, worker_id, lease_seconds, max_attempts)
+        if claimed is None:
+            # Leased shards may still expire and need retrying, so optionally keep polling
+            if poll_seconds and conn.execute("SELECT COUNT(*) FROM shards WHERE status = 'leased'").fetchone()[0]:
+                time.sleep(poll_seconds)
+                continue
+            break
+
+        shard_id, files = claimed
+        try:
+            process_shard(conn, shard_id, files, worker_id, output_dir, lease_seconds, batch_sizer=batch_sizer, db_path=db_path)
+            processed += 1
+        except Exception as e:
+            print(f"[{worker_id}] Shard {shard_id} failed: {e}")
+            fail_shard(conn, shard_id, worker_id, str(e), max_attempts)
+    conn.close()
+    print(f"[{worker_id}] Processed {processed} shards.")
+
+def queue_status(db_path):
+    """Return the number of shards per status."""
+    conn = connect(db_path)
+    counts = dict(conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall())
+    conn.close()
+    return counts
+
+def merge_shards(db_path, output_dir, output_csv, store_dir=None):
+    """Combine shard outputs in shard order into the final results and embedding store."""
+    conn = connect(db_path)
+    shards = conn.execute("SELECT id, status, output FROM shards ORDER BY id").fetchall()
+    conn.close()
+    unfinished = [shard_id for shard_id, status, _ in shards if status != "done"]
+    if unfinished:
+        raise RuntimeError(f"Cannot merge: {len(unfinished)} shards are not done (first: {unfinished[0]}).")
+
+    frames, matrices, group_offset = [], {}, 0
+    for shard_id, _, output in shards:
+        path = os.path.join(output_dir, output) if output else shard_dir(output_dir, shard_id)
+        with open(os.path.join(path, "store.json")) as f:
+            if json.load(f)["rows"] == 0:
+                continue
+        poolings = list_poolings(path)
+        metadata, _ = load_store(path, poolings[0])
+        # Group ids are local to each shard; offset them so they stay unique after merging
+        metadata["Group ID"] += group_offset
+        group_offset = int(metadata["Group ID"].max()) + 1
+        frames.append(metadata)
+        for pooling in poolings:
+            matrices.setdefault(pooling, []).append(np.load(os.path.join(path, f"{pooling}.npy")))
+
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    df.to_csv(output_csv, index=False)
+    print(f"Merged {len(df)} clauses from {len(shards)} shards into {output_csv}")
+    if store_dir and frames:
+        save_store(store_dir, df, {pooling: np.vstack(parts) for pooling, parts in matrices.items()})
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sharded contract analysis over a SQLite work queue.")
+    parser.add_argument("--db", default="outputs/shards/queue.sqlite", help="Work queue database on a shared directory.")
+    parser.add_argument("--output-dir", default="outputs/shards", help="Shared directory for partial shard outputs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = subparsers.add_parser("init", help="Split the PDF manifest into shards.")
+    init_parser.add_argument("--base-folder", default="generated_contracts", help="Folder or zip/tar archive containing the contracts.")
+    init_parser.add_argument("--shard-size", type=int, default=50, help="Contracts per shard.")
+
+    work_parser = subparsers.add_parser("work", help="Claim and process shards until the queue is drained.")
+    work_parser.add_argument("--worker-id", help="Worker name (defaults to host-pid).")
+    work_parser.add_argument("--lease-seconds", type=int, default=600, help="Lease length, renewed in the background while a shard runs.")
+    work_parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before a shard is marked failed.")
+    work_parser.add_argument("--poll-seconds", type=float, default=0, help="Keep waiting for expired leases instead of exiting.")
+
+    merge_parser = subparsers.add_parser("merge", help="Build the final results from finished shards.")
+    merge_parser.add_argument("--output-csv", default="outputs/results/contract_analysis_results.csv", help="Merged results CSV.")
+    merge_parser.add_argument("--store-dir", default="outputs/embeddings", help="Merged embedding store.")
+
+    subparsers.add_parser("status", help="Show shard counts per status.")
+    args = parser.parse_args()
+
+    if args.command == "init":
+        os.makedirs(os.path.dirname(args.db) or ".", exist_ok=True)
+        create_queue(args.db, args.base_folder, args.shard_size)
+    elif args.command == "work":
+        run_worker(args.db, args.output_dir, args.worker_id, args.lease_seconds, args.max_attempts, args.poll_seconds)
+    elif args.command == "merge":
+        merge_shards(args.db, args.output_dir, args.output_csv, args.store_dir)
+    else:
+        print(queue_status(args.db))
@@ -0,0 +1,37 @@
+import pandas as pd
+import analytics
+
+# Page text laid out like generate_random_contracts2.py: keyword lines are section headings
+pages = {
+    "contracts/a.pdf": [
+        "4. Payment Terms\nPayment is due within 30 days of invoice, late fees of 500 EUR apply.\n"
+        "5. Liability Cap\nThe total liability of the Consultant is capped at 250,000 SEK, except in cases of gross negligence.\n",
+        "7. Dispute Resolution\nDisputes shall be resolved in accordance with the laws of Sweden in arbitration.\n",
+    ],
+    "contracts/b.pdf": [
+        "5. Liability Cap\nNeither Party's liability shall exceed 150,000 SEK, except where legally prohibited.\n"
+        "7. Dispute Resolution\nThis Agreement is governed by Sweden law.\n",
+    ],
+}
+
+def clause_row(file_path, page, heading, clause):
+    return {"Company": "Acme", "Contract Type": "MSA", "Clause": clause, "Content": heading, "File": file_path,
+            "Page": page, "Offset": pages[file_path][page - 1].index(heading), "Tone": "neutral"}
+
+def test_liability_by_jurisdiction(tmp_path):
+    input_csv = tmp_path / "results.csv"
+    pd.DataFrame([
+        clause_row("contracts/a.pdf", 1, "Payment Terms", "payment terms"),
+        clause_row("contracts/a.pdf", 1, "Liability Cap", "liability cap"),
+        clause_row("contracts/b.pdf", 1, "Liability Cap", "liability cap"),
+    ]).to_csv(input_csv, index=False)
+
+    analytics.export_results(str(input_csv), str(tmp_path / "analytics"), page_lookup=pages.get)
+
+    clauses = analytics.query("SELECT Clause, Amount, Currency, Days, Jurisdiction FROM clauses", str(tmp_path / "analytics"))
+    payment = clauses[clauses["Clause"] == "payment terms"].iloc[0]
+    # The 500 EUR late fee is not a liability cap
+    assert pd.isna(payment["Amount"]) and payment["Days"] == 30
+    result = analytics.query(analytics.canned_queries["liability-by-jurisdiction"], str(tmp_path / "analytics"))
+    assert result[["Jurisdiction", "Currency", "Contracts"]].values.tolist() == [["Sweden", "SEK", 2]]
+    assert result["Average Liability Cap"].iloc[0] == 200000
@@ -0,0 +1,103 @@
+import os
+import json
+import zlib
+import hashlib
+import sqlite3
+import threading
+import fitz  # PyMuPDF
+from extract_text import extract_pages_from_pdf
+
+# Bump when extraction changes so stale text is never reused
+extractor_version = f"pymupdf-{fitz.VersionBind}-pages-1"
+
+default_cache_path = "outputs/cache/text_cache.sqlite"
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of PDF bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+class TextCache:
+    """Persistent per-page text cache keyed by PDF content hash and extractor version."""
+
+    def __init__(self, path=default_cache_path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        # Pages are zlib-compressed JSON, one row per document for random access
+        self.conn.execute("CREATE TABLE IF NOT EXISTS texts (content_hash TEXT, extractor TEXT, pages BLOB, PRIMARY KEY (content_hash, extractor))")
+        # Remember file hashes so unchanged files aren't re-read just to be hashed
+        self.conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, content_hash TEXT)")
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def file_hash(self, pdf_path):
+        """Return the content hash of a file, reusing the stored one while size and mtime are unchanged."""
+        stat = os.stat(pdf_path)
+        path = os.path.abspath(pdf_path)
+        row = self.conn.execute("SELECT size, mtime, content_hash FROM files WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return row[2]
+        with open(pdf_path, "rb") as f:
+            digest = content_hash(f.read())
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, stat.st_size, stat.st_mtime, digest))
+        self.conn.commit()
+        return digest
+
+    def lookup(self, digest):
+        """Return cached page texts for a content hash, or None."""
+        row = self.conn.execute("SELECT pages FROM texts WHERE content_hash = ? AND extractor = ?", (digest, extractor_version)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def store(self, digest, pages):
+        blob = zlib.compress(json.dumps(pages).encode("utf-8"), 6)
+        self.conn.execute("INSERT OR REPLACE INTO texts VALUES (?, ?, ?)", (digest, extractor_version, blob))
+        self.conn.commit()
+
+    def get_pages(self, pdf_path=None, data=None):
+        """Return the page texts of a PDF given by path or bytes, extracting only on a cache miss."""
+        digest = content_hash(data) if data is not None else self.file_hash(pdf_path)
+        pages = self.lookup(digest)
+        if pages is not None:
+            self.hits += 1
+            return pages
+        self.misses += 1
+        pages = extract_pages_from_pdf(pdf_path, stream=data)
+        self.store(digest, pages)
+        return pages
+
+    def get_text(self, pdf_path=None, data=None):
+        """Return the full text of a PDF, as extract_text.extract_text_from_pdf would."""
+        return "".join(self.get_pages(pdf_path, data))
+
+    def close(self):
+        self.conn.close()
+
+# SQLite connections can't be used from another thread, so each thread keeps its own caches
+_local = threading.local()
+
+def get_text_cache(path=default_cache_path):
+    """Return one TextCache per process, thread and path, so worker processes and server threads each keep their own connection."""
+    if getattr(_local, "pid", None) != os.getpid():
+        # A forked child inherits the parent's thread-local state; start fresh
+        _local.pid = os.getpid()
+        _local.caches = {}
+    if path not in _local.caches:
+        _local.caches[path] = TextCache(path)
+    return _local.caches[path]
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Warm the extracted-text cache for a folder of PDFs.")
+    parser.add_argument("base_folder", nargs="?", default="generated_contracts", help="Folder containing the contracts.")
+    parser.add_argument("--cache", default=default_cache_path, help="Path to the cache database.")
+    args = parser.parse_args()
+
+    cache = TextCache(args.cache)
+    for root, _, files in os.walk(args.base_folder):
+        for file in files:
+            if file.endswith(".pdf"):
+                cache.get_pages(os.path.join(root, file))
+    print(f"Cache hits: {cache.hits}, newly extracted: {cache.misses}")
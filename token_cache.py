@@ -0,0 +1,125 @@
+import os
+import fcntl
+import hashlib
+import numpy as np
+
+default_token_cache_dir = "outputs/cache/tokens"
+
+# One fixed-size index record per cached text: sha1 hex digest, start in the flat id array, token count
+entry_dtype = np.dtype([("key", "S40"), ("offset", "<i8"), ("length", "<i4")])
+
+def token_key(text):
+    """Return the cache key for a piece of text."""
+    # Hex rather than raw digest bytes, since numpy strips trailing null bytes from "S" fields
+    return hashlib.sha1(text.encode("utf-8")).hexdigest().encode("ascii")
+
+class TokenCache:
+    """Token-id sequences keyed by text hash, stored as one flat id array plus an append-only index."""
+
+    def __init__(self, tokenizer, max_length=512, cache_dir=default_token_cache_dir):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.cache_dir = cache_dir
+        # LEGAL-BERT's vocabulary fits in uint16, which halves the store size
+        self.dtype = np.dtype(np.uint16 if len(tokenizer) <= 2**16 else np.int32)
+        # Index records sorted by key and searched with searchsorted, at 52 bytes per cached text
+        self.entries = np.empty(0, dtype=entry_dtype)
+        self.ids = np.empty(0, dtype=self.dtype)
+        if not cache_dir:
+            return
+
+        # Different tokenizers or truncation lengths give different ids, so each gets its own files
+        name = f"{tokenizer.name_or_path.replace('/', '_')}-{max_length}"
+        self.ids_path = os.path.join(cache_dir, f"{name}.ids")
+        self.entries_path = os.path.join(cache_dir, f"{name}.entries")
+        if os.path.isfile(self.entries_path) and os.path.isfile(self.ids_path) and os.path.getsize(self.ids_path):
+            self.ids = np.memmap(self.ids_path, dtype=self.dtype, mode="r")
+            entries = np.fromfile(self.entries_path, dtype=entry_dtype)
+            # Ignore entries whose ids never fully reached the disk
+            valid = entries[entries["offset"] + entries["length"] <= len(self.ids)]
+            # Processes racing on the same text may both have appended it; either copy will do
+            _, first = np.unique(valid["key"], return_index=True)
+            self.entries = valid[first]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, keys):
+        """Return the index position of each key and whether it is cached."""
+        positions = np.searchsorted(self.entries["key"], keys)
+        found = positions < len(self.entries)
+        found[found] = self.entries["key"][positions[found]] == keys[found]
+        return positions, found
+
+    def get(self, position):
+        offset, length = int(self.entries["offset"][position]), int(self.entries["length"][position])
+        return np.asarray(self.ids[offset:offset + length])
+
+    def encode(self, texts):
+        """Return one token-id array per text, batch-encoding only the texts not cached yet."""
+        keys = np.array([token_key(text) for text in texts], dtype="S40")
+        positions, found = self.lookup(keys)
+        sequences = [self.get(position) if hit else None for position, hit in zip(positions, found)]
+        missing = {}
+        for key, text, hit in zip(keys.tolist(), texts, found):
+            if not hit and key not in missing:
+                missing[key] = text
+
+        if missing:
+            # A single call lets the Rust fast tokenizer encode the batch in parallel
+            encoded = self.tokenizer(list(missing.values()), truncation=True, max_length=self.max_length,
+                                     return_attention_mask=False, return_token_type_ids=False)["input_ids"]
+            new = {key: np.asarray(ids, dtype=self.dtype) for key, ids in zip(missing, encoded)}
+            # Newly encoded ids are only held for this call; afterwards they are read back from the memmap
+            sequences = [new[key] if sequence is None else sequence for key, sequence in zip(keys.tolist(), sequences)]
+            self._append(new)
+        return sequences
+
+    def _append(self, new):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.entries_path, "ab") as entries_file, open(self.ids_path, "ab") as ids_file:
+            # Worker processes share the files, so offsets are taken under an exclusive lock
+            fcntl.flock(entries_file, fcntl.LOCK_EX)
+            try:
+                offset = ids_file.seek(0, os.SEEK_END) // self.dtype.itemsize
+                entries = np.empty(len(new), dtype=entry_dtype)
+                for i, (key, ids) in enumerate(new.items()):
+                    entries[i] = (key, offset, len(ids))
+                    offset += len(ids)
+                ids_file.write(np.concatenate(list(new.values())).astype(self.dtype).tobytes())
+                ids_file.flush()
+                entries_file.write(entries.tobytes())
+            finally:
+                fcntl.flock(entries_file, fcntl.LOCK_UN)
+        # Remap the grown id file so the new entries are served from disk instead of memory
+        self.ids = np.memmap(self.ids_path, dtype=self.dtype, mode="r")
+        entries.sort(order="key")
+        self.entries = np.insert(self.entries, np.searchsorted(self.entries["key"], entries["key"]), entries)
+
+_caches = {}
+
+def get_token_cache(tokenizer, max_length=512, cache_dir=default_token_cache_dir):
+    """Return one TokenCache per process, tokenizer and max_length."""
+    key = (os.getpid(), tokenizer.name_or_path, max_length, cache_dir)
+    if key not in _caches:
+        _caches[key] = TokenCache(tokenizer, max_length, cache_dir)
+    return _caches[key]
+
+if __name__ == "__main__":
+    import argparse
+    import pandas as pd
+    from process_tokens import get_model
+
+    parser = argparse.ArgumentParser(description="Warm the token-id cache for the clauses in a results CSV.")
+    parser.add_argument("--input-csv", default="outputs/results/contract_analysis_results.csv", help="Clauses to tokenize.")
+    parser.add_argument("--max-length", type=int, default=512, help="Truncation length used by the embedding scripts.")
+    args = parser.parse_args()
+
+    tokenizer, _ = get_model()
+    cache = get_token_cache(tokenizer, args.max_length)
+    before = len(cache)
+    for chunk in pd.read_csv(args.input_csv, usecols=["Content"], chunksize=100000):
+        cache.encode(chunk["Content"].astype(str).tolist())
+    print(f"Token cache holds {len(cache)} texts ({len(cache) - before} newly tokenized)")
@@ -1,29 +1,17 @@
 import os
+import re
+import shutil
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from transformers import AutoTokenizer, AutoModel
-import torch
+from embedding_store import create_store_matrix, write_store_info
+from process_tokens import embed_texts, get_model
 
-# Load LEGAL-BERT model and tokenizer
-def load_bert_model():
-    """Load LEGAL-BERT model and tokenizer."""
-    tokenizer = AutoTokenizer.from_pretrained("nlpaueb/legal-bert-base-uncased")
-    model = AutoModel.from_pretrained("nlpaueb/legal-bert-base-uncased")
-    return tokenizer, model
-
-def process_text_with_bert(text, tokenizer, model):
-    """Generate embeddings for text using LEGAL-BERT."""
-    tokens = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-    with torch.no_grad():
-        outputs = model(**tokens)
-    return outputs.last_hidden_state.mean(dim=1)  # Mean pooling of embeddings
+# Keywords that mark a clause as favouring one side
+customer_keywords = ["highest level of care", "rigorous controls", "promptly reported"]
+supplier_keywords = ["reasonable efforts", "commercially reasonable", "not liable for"]
 
 def label_tone(content):
     """Assign tones to content based on keywords."""
-    customer_keywords = ["highest level of care", "rigorous controls", "promptly reported"]
-    supplier_keywords = ["reasonable efforts", "commercially reasonable", "not liable for"]
-
     content_lower = content.lower()
     if any(keyword in content_lower for keyword in customer_keywords):
         return "customer-friendly"
@@ -31,48 +19,52 @@ def label_tone(content):
         return "supplier-friendly"
     return "neutral"
 
-def validate_embeddings(input_csv, output_csv):
-    """Load clauses, process embeddings, label tones, and save results."""
-    print(f"Loading data from: {input_csv}")
-    data = pd.read_csv(input_csv)
-    
-    # Load LEGAL-BERT model and tokenizer
-    print("Loading LEGAL-BERT model...")
-    tokenizer, model = load_bert_model()
+def label_tones(contents):
+    """Vectorized label_tone over a Series of clause texts."""
+    contents = contents.astype(str).str.lower()
+    customer = contents.str.contains("|".join(re.escape(k) for k in customer_keywords))
+    supplier = contents.str.contains("|".join(re.escape(k) for k in supplier_keywords))
+    return pd.Series(np.select([customer, supplier], ["customer-friendly", "supplier-friendly"], "neutral"), index=contents.index)
 
-    # Process each clause
-    results = []
-    for _, row in data.iterrows():
-        company = row["Company"]
-        contract_type = row["Contract Type"]
-        clause = row["Clause"]
-        content = row["Content"]
+def count_rows(input_csv, chunk_size=100000):
+    """Count the data rows of a CSV without loading it."""
+    return sum(len(chunk) for chunk in pd.read_csv(input_csv, usecols=["Content"], chunksize=chunk_size))
 
-        # Generate embeddings
-        embedding = process_text_with_bert(content, tokenizer, model)
-        embedding_list = embedding.squeeze(0).tolist()  # Convert tensor to list
+def validate_embeddings(input_csv, output_csv, store_dir="outputs/validated_embeddings", chunk_size=10000, batch_size=32):
+    """Embed and tone-label clauses chunk by chunk, writing metadata to CSV and vectors to an embedding store."""
+    print(f"Loading data from: {input_csv}")
+    rows = count_rows(input_csv)
 
-        # Label tone
-        tone = label_tone(content)
+    # Vectors go straight into a preallocated on-disk matrix, so memory stays at one chunk
+    print("Loading LEGAL-BERT model...")
+    _, model = get_model()
+    matrix = create_store_matrix(store_dir, "mean", rows, model.config.hidden_size)
 
-        # Append results
-        results.append({
-            "Company": company,
-            "Contract Type": contract_type,
-            "Clause": clause,
-            "Content": content,
-            "Embeddings": embedding_list,  # Save embeddings as list
-            "Tone": tone
-        })
+    start = 0
+    # Embedding strings from older results are never needed here
+    for chunk in pd.read_csv(input_csv, usecols=lambda column: column not in ("Embeddings", "Embedding Shape"), chunksize=chunk_size):
+        print(f"Embedding clauses {start + 1}-{start + len(chunk)} of {rows}...")
+        chunk["Content"] = chunk["Content"].astype(str)
+        matrix[start:start + len(chunk)] = embed_texts(chunk["Content"].tolist(), batch_size=batch_size)
+        chunk["Tone"] = label_tones(chunk["Content"])
+        chunk.to_csv(output_csv, mode="w" if start == 0 else "a", header=start == 0, index=False)
+        start += len(chunk)
 
-    # Save results
-    print("Saving results to CSV...")
-    output_df = pd.DataFrame(results)
-    output_df.to_csv(output_csv, index=False)
+    matrix.flush()
+    del matrix
+    shutil.copyfile(output_csv, os.path.join(store_dir, "metadata.csv"))
+    write_store_info(store_dir, ["mean"], rows)
     print(f"Updated data saved to: {output_csv}")
+    print(f"Embeddings saved to: {store_dir}")
 
 if __name__ == "__main__":
-    input_csv = "outputs/results/contract_analysis_results.csv"
-    output_csv = "outputs/results/validated_clauses_with_tones.csv"
-    validate_embeddings(input_csv, output_csv)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Embed and tone-label extracted clauses.")
+    parser.add_argument("--input-csv", default="outputs/results/contract_analysis_results.csv", help="Clauses to validate.")
+    parser.add_argument("--output-csv", default="outputs/results/validated_clauses_with_tones.csv", help="Where to write clause metadata and tones.")
+    parser.add_argument("--store-dir", default="outputs/validated_embeddings", help="Where to write the embedding matrix.")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows read and embedded at a time.")
+    args = parser.parse_args()
 
+    validate_embeddings(args.input_csv, args.output_csv, args.store_dir, args.chunk_size)
@@ -1,12 +1,17 @@
 import pandas as pd
 import numpy as np
+from embedding_store import load_store
+from embedding_compression import load_compressed
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import PCA
 
-def load_embeddings(input_csv):
+def load_embeddings(input_csv, store_dir=None, pooling="mean", compression=None):
     """Load embeddings from a CSV file and process into numpy arrays."""
+    if store_dir:
+        return load_embeddings_from_store(input_csv, store_dir, pooling, compression)
+
     print("Loading data from:", input_csv)
     data = pd.read_csv(input_csv)
 
@@ -17,6 +22,19 @@ def load_embeddings(input_csv):
     data = data[data["Embeddings"].apply(lambda emb: len(emb) > 0)]
     return data
 
+def load_embeddings_from_store(input_csv, store_dir, pooling="mean", compression=None):
+    """Load clause data from a CSV and vectors from an embedding store, optionally compressed (float16, pca or pq)."""
+    print("Loading data from:", input_csv, "and", store_dir)
+    data = pd.read_csv(input_csv)
+    if compression:
+        matrix = load_compressed(store_dir, pooling, compression)
+    else:
+        _, matrix = load_store(store_dir, pooling)
+    if len(matrix) != len(data):
+        raise ValueError(f"{input_csv} has {len(data)} rows but {store_dir} has {len(matrix)} vectors.")
+    data["Embeddings"] = list(np.asarray(matrix, dtype=np.float32))
+    return data
+
 def compute_similarity_matrix(embeddings):
     """Compute cosine similarity matrix for embeddings."""
     if embeddings is None or len(embeddings) == 0:
@@ -62,9 +80,9 @@ def plot_embeddings_scatter(data, title, save_path=None):
         print(f"PCA scatter plot saved to: {save_path}")
     plt.show()
 
-def main(input_csv):
+def main(input_csv, store_dir=None):
     print("Processing embeddings and tones...")
-    data = load_embeddings(input_csv)
+    data = load_embeddings(input_csv, store_dir)
 
     # Separate embeddings based on tone
     neutral_data = data[data["Tone"] == "neutral"]
@@ -91,5 +109,6 @@ def main(input_csv):
 
 if __name__ == "__main__":
     input_csv = "outputs/results/validated_clauses_with_tones.csv"  # Input CSV file
-    main(input_csv)
+    store_dir = "outputs/validated_embeddings"  # Vectors written by validate_embeddings.py
+    main(input_csv, store_dir)
 
@@ -3,11 +3,14 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.metrics import roc_auc_score, roc_curve, precision_recall_curve
 from sklearn.metrics.pairwise import cosine_similarity
+from score_histograms import ScoreHistogram
+from visualize_embeddings import load_embeddings_from_store
 
-# Load embeddings and tones from CSV
-def load_embeddings(file_path):
+# Load embeddings and tones from CSV, or the CSV plus an embedding store
+def load_embeddings(file_path, store_dir=None):
+    if store_dir:
+        return load_embeddings_from_store(file_path, store_dir)
     print(f"Loading data from: {file_path}")
     data = pd.read_csv(file_path)
     data["Embeddings"] = data["Embeddings"].apply(lambda x: np.array(eval(x), dtype=np.float32))
@@ -66,16 +69,16 @@ def prepare_evaluation_data(data, similarity_matrix, tone_label):
     return labels, scores
 
 # Plot ROC AUC
-def plot_roc_auc(labels, scores, tone_label, output_file):
-    if len(set(labels)) < 2:
+def plot_roc_auc(histogram, tone_label, output_file):
+    if histogram.positives.sum() == 0 or histogram.negatives.sum() == 0:
         print(f"Skipping ROC AUC plot for {tone_label} due to single-class labels.")
         return
 
-    fpr, tpr, _ = roc_curve(labels, scores)
-    roc_auc = roc_auc_score(labels, scores)
+    fpr, tpr, _ = histogram.roc_curve()
+    roc_auc = histogram.auc()
 
     plt.figure()
-    plt.plot(fpr, tpr, label=f"ROC curve (area = {roc_auc:.2f})")
+    plt.plot(fpr, tpr, label=f"ROC curve (area = {roc_auc:.2f} ± {histogram.auc_error_bound():.3f})")
     plt.plot([0, 1], [0, 1], "k--")
     plt.xlim([0.0, 1.0])
     plt.ylim([0.0, 1.05])
@@ -88,15 +91,15 @@ def plot_roc_auc(labels, scores, tone_label, output_file):
     plt.close()
 
 # Plot Precision-Recall Curve
-def plot_precision_recall(labels, scores, tone_label, output_file):
-    if len(set(labels)) < 2:
+def plot_precision_recall(histogram, tone_label, output_file):
+    if histogram.positives.sum() == 0 or histogram.negatives.sum() == 0:
         print(f"Skipping Precision-Recall plot for {tone_label} due to single-class labels.")
         return
 
-    precision, recall, _ = precision_recall_curve(labels, scores)
+    precision, recall, _ = histogram.precision_recall_curve()
 
     plt.figure()
-    plt.plot(recall, precision, label=f"Precision-Recall Curve")
+    plt.plot(recall, precision, label=f"Precision-Recall Curve (AP = {histogram.average_precision():.2f})")
     plt.xlabel("Recall")
     plt.ylabel("Precision")
     plt.title(f"Precision-Recall Curve - {tone_label}")
@@ -106,8 +109,8 @@ def plot_precision_recall(labels, scores, tone_label, output_file):
     plt.close()
 
 # Main function to process and visualize embeddings
-def main(input_csv):
-    data = load_embeddings(input_csv)
+def main(input_csv, store_dir=None):
+    data = load_embeddings(input_csv, store_dir)
 
     # Compute similarity matrices
     print("Computing similarity matrices...")
@@ -127,10 +130,12 @@ def main(input_csv):
     print("Generating ROC AUC and Precision-Recall plots...")
     for tone_label, similarity_matrix in zip(["neutral", "supplier-friendly"], [neutral_similarity, supplier_similarity]):
         labels, scores = prepare_evaluation_data(data, similarity_matrix, tone_label)
-        plot_roc_auc(labels, scores, tone_label, f"outputs/visualizations/roc_auc_{tone_label}.png")
-        plot_precision_recall(labels, scores, tone_label, f"outputs/visualizations/precision_recall_{tone_label}.png")
+        histogram = ScoreHistogram().add(scores, labels)
+        plot_roc_auc(histogram, tone_label, f"outputs/visualizations/roc_auc_{tone_label}.png")
+        plot_precision_recall(histogram, tone_label, f"outputs/visualizations/precision_recall_{tone_label}.png")
 
 if __name__ == "__main__":
     input_csv = "outputs/results/validated_clauses_with_tones.csv"
-    main(input_csv)
+    store_dir = "outputs/validated_embeddings"
+    main(input_csv, store_dir)
 
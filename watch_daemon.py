@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import time
+import pandas as pd
+from analyze_contracts import extract_contract_clauses, embed_clause_rows
+from archive_input import contract_info
+from autotune import AdaptiveBatchSizer, load_host_config, apply_config
+from embedding_store import append_store, replace_store_rows
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+class FolderWatcher:
+    """Report PDF paths that may have changed, using inotify when available and polling otherwise."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.inotify = None
+        self.watches = {}
+        if INotify is not None and sys.platform.startswith("linux"):
+            self.inotify = INotify()
+            self._watch_tree(folder)
+        print(f"Watching {folder} with {'inotify' if self.inotify else 'polling'}")
+
+    def _watch_tree(self, folder):
+        mask = flags.CREATE | flags.CLOSE_WRITE | flags.MOVED_TO | flags.MODIFY
+        for root, _, _ in os.walk(folder):
+            if root not in self.watches.values():
+                self.watches[self.inotify.add_watch(root, mask)] = root
+
+    def scan(self):
+        """Return every PDF under the folder."""
+        paths = set()
+        for root, _, files in os.walk(self.folder):
+            paths.update(os.path.join(root, file) for file in files if file.endswith(".pdf"))
+        return paths
+
+    def changed_paths(self, timeout):
+        """Wait up to timeout seconds and return candidate PDF paths."""
+        if self.inotify is None:
+            time.sleep(timeout)
+            return self.scan()
+
+        paths = set()
+        for event in self.inotify.read(timeout=int(timeout * 1000)):
+            path = os.path.join(self.watches.get(event.wd, self.folder), event.name)
+            if event.mask & flags.ISDIR:
+                # New company folders need their own watch, and may already hold files
+                self._watch_tree(path)
+                paths.update(p for p in self.scan() if p.startswith(path + os.sep))
+            elif path.endswith(".pdf"):
+                paths.add(path)
+        return paths
+
+def looks_complete(path):
+    """Cheap check that a PDF has been fully written: it must end with an %%EOF marker."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(max(0, os.path.getsize(path) - 1024))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+class Debouncer:
+    """Release files only once their size and mtime have been stable for settle_seconds."""
+
+    def __init__(self, settle_seconds=2.0):
+        self.settle_seconds = settle_seconds
+        self.pending = {}
+
+    def update(self, candidates, processed):
+        """Track candidate paths and return those that are ready to process."""
+        now = time.time()
+        ready = []
+        for path in set(candidates) | set(self.pending):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self.pending.pop(path, None)
+                continue
+            signature = [stat.st_size, stat.st_mtime]
+            if processed.get(path) == signature:
+                self.pending.pop(path, None)
+                continue
+
+            previous = self.pending.get(path)
+            if previous is None or previous[0] != signature:
+                self.pending[path] = (signature, now)
+            elif now - previous[1] >= self.settle_seconds and looks_complete(path):
+                ready.append((path, signature))
+                del self.pending[path]
+        return ready
+
+def load_state(state_path):
+    """Load which files have been processed and the next free group id."""
+    if os.path.isfile(state_path):
+        with open(state_path) as f:
+            return json.load(f)
+    return {"processed": {}, "next_group_id": 0}
+
+def save_state(state, state_path):
+    """Write the daemon state atomically."""
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+def write_results(df, output_csv, replaced_files=()):
+    """Add rows to the results CSV in its existing column order, replacing rows of re-processed files."""
+    if not os.path.isfile(output_csv):
+        if len(df):
+            df.to_csv(output_csv, index=False)
+        return
+    columns = pd.read_csv(output_csv, nrows=0).columns
+    if replaced_files and "File" in columns:
+        existing = pd.read_csv(output_csv)
+        existing = existing[~existing["File"].isin(replaced_files)]
+        pd.concat([existing, df.reindex(columns=columns)], ignore_index=True).to_csv(output_csv, index=False)
+    else:
+        df.reindex(columns=columns).to_csv(output_csv, mode="a", header=False, index=False)
+
+def process_batch(batch, state, output_csv, store_dir, batch_sizer):
+    """Analyze a micro-batch of new PDFs and append the results and embeddings."""
+    results, extracted = [], []
+    for path, signature in batch:
+        print(f"Analyzing: {path}")
+        try:
+            results.extend(extract_contract_clauses(path, *contract_info(path)))
+        except Exception as e:
+            # Left unprocessed so it is retried, and its earlier rows are kept meanwhile
+            print(f"Skipping {path}: {e}")
+            continue
+        extracted.append((path, signature))
+
+    # A contract saved again at the same path replaces its earlier rows instead of duplicating them
+    resaved = [path for path, _ in extracted if path in state["processed"]]
+    if results:
+        df, embeddings = embed_clause_rows(results, batch_sizer=batch_sizer)
+        # Group ids are batch-local; keep them unique across the whole store
+        df["Group ID"] += state["next_group_id"]
+        state["next_group_id"] = int(df["Group ID"].max()) + 1
+        write_results(df, output_csv, resaved)
+        if resaved:
+            replace_store_rows(store_dir, "File", resaved, df, embeddings)
+        else:
+            append_store(store_dir, df, embeddings)
+    elif resaved:
+        # The new version has no clauses left, so only its old rows go
+        write_results(pd.DataFrame(columns=["File"]), output_csv, resaved)
+        replace_store_rows(store_dir, "File", resaved, None, None)
+
+    for path, signature in extracted:
+        state["processed"][path] = signature
+    print(f"Appended {len(results)} clauses from {len(extracted)} of {len(batch)} contracts.")
+
+def watch(folder, output_csv, store_dir, state_path="outputs/watch_state.json", batch_size=16, max_wait_seconds=5.0,
+          settle_seconds=2.0, poll_seconds=1.0):
+    """Watch a drop folder and analyze new contracts in debounced micro-batches."""
+    config = load_host_config()
+    apply_config(config)
+    batch_sizer = AdaptiveBatchSizer(batch_size=config["batch_size"])
+    state = load_state(state_path)
+    watcher = FolderWatcher(folder)
+    debouncer = Debouncer(settle_seconds)
+
+    # Anything already in the folder but not yet processed is picked up on start
+    ready, oldest_ready = [], None
+    candidates = watcher.scan()
+    while True:
+        for item in debouncer.update(candidates, state["processed"]):
+            ready.append(item)
+            oldest_ready = oldest_ready or time.time()
+
+        if ready and (len(ready) >= batch_size or time.time() - oldest_ready >= max_wait_seconds):
+            batch, ready = ready[:batch_size], ready[batch_size:]
+            process_batch(batch, state, output_csv, store_dir, batch_sizer)
+            save_state(state, state_path)
+            oldest_ready = time.time() if ready else None
+
+        # Wake up often enough to release settled files even without new events
+        candidates = watcher.changed_paths(min(poll_seconds, settle_seconds))
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Watch a drop folder and analyze new contracts as they arrive.")
+    parser.add_argument("folder", nargs="?", default="generated_contracts", help="Folder to watch.")
+    parser.add_argument("--output-csv", default="outputs/results/contract_analysis_results.csv", help="Results CSV to append to.")
+    parser.add_argument("--store-dir", default="outputs/embeddings", help="Embedding store to append to.")
+    parser.add_argument("--batch-size", type=int, default=16, help="Contracts per micro-batch.")
+    parser.add_argument("--max-wait", type=float, default=5.0, help="Seconds a ready contract waits for its batch to fill.")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds a file must stay unchanged before it is processed.")
+    args = parser.parse_args()
+
+    try:
+        watch(args.folder, args.output_csv, args.store_dir, batch_size=args.batch_size,
+              max_wait_seconds=args.max_wait, settle_seconds=args.settle)
+    except KeyboardInterrupt:
+        print("Stopped watching.")